@@ -0,0 +1,394 @@
+"""A lightweight stand-in for the parts of the Blender Python API used by the add-on.
+
+It only models the data the add-on reads and writes (scenes, compositor nodes, movie clips,
+tracking markers, render settings), so the pipeline code can be timed on a machine without Blender.
+Rendering itself is not simulated, bpy.ops.render.render does nothing.
+"""
+import os
+import sys
+import copy
+import types
+import numpy as np
+
+
+#----------------------------------------
+#   DATA
+#----------------------------------------
+class RNA:
+    """Stands in for bl_rna, the stand-in structs expose no generic RNA properties."""
+    properties = ()
+
+class Struct:
+    bl_rna = RNA()
+
+    def __init__(self, **kwargs):
+        self.__dict__.update(kwargs)
+
+class ID(Struct):
+    id_collection = None
+
+    def __deepcopy__(self, memo):
+        #Datablocks are referenced, not copied, like ID pointers in Blender
+        return self
+
+    @property
+    def name(self):
+        return self._name
+
+    @name.setter
+    def name(self, name):
+        if self.id_collection is not None:
+            name = self.id_collection.rename(self, name)
+        self._name = name
+
+class IDCollection:
+    """Collection of datablocks addressed by name, iterated in name order like bpy.data collections."""
+
+    def __init__(self):
+        self.items = {}
+
+    def unique_name(self, name):
+        base, index = name, 0
+        while name in self.items:
+            index += 1
+            name = "%s.%03d" % (base, index)
+        return name
+
+    def link(self, item, name):
+        item.id_collection = None
+        item.name = self.unique_name(name)
+        self.items[item.name] = item
+        item.id_collection = self
+        return item
+
+    def rename(self, item, name):
+        del self.items[item.name]
+        name = self.unique_name(name)
+        self.items[name] = item
+        return name
+
+    def get(self, name, default=None):
+        return self.items.get(name, default)
+
+    def keys(self):
+        return sorted(self.items)
+
+    def __getitem__(self, name):
+        return self.items[name]
+
+    def __iter__(self):
+        return iter([self.items[name] for name in self.keys()])
+
+    def __len__(self):
+        return len(self.items)
+
+    def remove(self, item, do_unlink=True):
+        del self.items[item.name]
+        item.id_collection = None
+        #The nodes of a removed scene no longer use their clips
+        for node in getattr(getattr(item, "node_tree", None), "nodes", ()):
+            node.clip = None
+        if do_unlink:
+            for scene in data.scenes:
+                for node in scene.node_tree.nodes:
+                    if getattr(node, "clip", None) is item:
+                        node.clip = None
+
+class PropCollection(list):
+    """Stands in for a CollectionProperty."""
+
+    def __init__(self, item_type):
+        super().__init__()
+        self.item_type = item_type
+
+    def add(self):
+        item = self.item_type()
+        self.append(item)
+        return item
+
+    def remove(self, index):
+        del self[index]
+
+    def move(self, from_index, to_index):
+        self.insert(to_index, self.pop(from_index))
+
+    def find(self, name):
+        return next((i for i, item in enumerate(self) if getattr(item, "name", None) == name), -1)
+
+    def get(self, name, default=None):
+        index = self.find(name)
+        return self[index] if index >= 0 else default
+
+
+#----------------------------------------
+#   COMPOSITOR
+#----------------------------------------
+class Socket(Struct):
+    def __init__(self, node, identifier):
+        super().__init__(node=node, identifier=identifier, is_linked=False)
+
+class Node(Struct):
+    def __init__(self, name, bl_idname, outputs=("Image",), inputs=("Image",), **kwargs):
+        self.__dict__["clip"] = None
+        if kwargs.get("clip") is not None:
+            kwargs["clip"].user_count += 1
+        super().__init__(name=name, bl_idname=bl_idname, mute=False, location=types.SimpleNamespace(x=0, y=0),
+            outputs=[Socket(self, o) for o in outputs], inputs=[Socket(self, i) for i in inputs], **kwargs)
+
+    def __setattr__(self, name, value):
+        #Clip pointers count the users of the clips like in Blender
+        if name == "clip":
+            old_clip = self.__dict__.get("clip")
+            if old_clip is not None:
+                old_clip.user_count -= 1
+            if value is not None:
+                value.user_count += 1
+        super().__setattr__(name, value)
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if state.get("clip") is not None:
+            state["clip"].user_count += 1
+
+class Link(Struct):
+    pass
+
+class Links(list):
+    def new(self, from_socket, to_socket):
+        for link in list(self):
+            if link.to_socket is to_socket:
+                self.remove(link)
+        link = Link(from_node=from_socket.node, from_socket=from_socket,
+            to_node=to_socket.node, to_socket=to_socket)
+        to_socket.is_linked = True
+        self.append(link)
+        return link
+
+class Nodes(list):
+    def get(self, name, default=None):
+        for node in self:
+            if node.name == name:
+                return node
+        return default
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            node = self.get(key)
+            if node is None:
+                raise KeyError(key)
+            return node
+        return super().__getitem__(key)
+
+    def new(self, bl_idname):
+        kwargs = {}
+        if bl_idname == "CompositorNodeOutputFile":
+            kwargs = dict(base_path="", file_slots=[Struct(path="")],
+                format=Struct(file_format="PNG", color_mode="RGBA"))
+        node = Node(bl_idname, bl_idname, **kwargs)
+        self.append(node)
+        return node
+
+def new_node_tree():
+    """Returns the node setup of the base project (Movie Clip, Stabilize 2D, Keying, Crop, Composite)."""
+    nodes = Nodes([
+        Node("Movie Clip", "CompositorNodeMovieClip", clip=None, inputs=()),
+        Node("Stabilize 2D", "CompositorNodeStabilize", clip=None),
+        Node("Keying", "CompositorNodeKeying", outputs=("Image", "Matte", "Edges")),
+        Node("Crop", "CompositorNodeCrop", use_crop_size=True, relative=False, min_x=0, max_x=100,
+            min_y=0, max_y=100, rel_min_x=0.0, rel_max_x=1.0, rel_min_y=0.0, rel_max_y=1.0),
+        Node("Composite", "CompositorNodeComposite", outputs=()),
+    ])
+    tree = Struct(nodes=nodes, links=Links())
+    tree.links.new(nodes["Movie Clip"].outputs[0], nodes["Stabilize 2D"].inputs[0])
+    tree.links.new(nodes["Stabilize 2D"].outputs[0], nodes["Keying"].inputs[0])
+    tree.links.new(nodes["Keying"].outputs[0], nodes["Crop"].inputs[0])
+    tree.links.new(nodes["Crop"].outputs[0], nodes["Composite"].inputs[0])
+    return tree
+
+
+#----------------------------------------
+#   SCENES AND CLIPS
+#----------------------------------------
+class Render(Struct):
+    def __init__(self):
+        super().__init__(filepath="", use_overwrite=True, resolution_x=1920, resolution_y=1080,
+            resolution_percentage=100, image_settings=Struct(file_format="PNG", color_mode="RGBA"),
+            ffmpeg=Struct(format="MPEG4", codec="H264", constant_rate_factor="MEDIUM", audio_codec="NONE"))
+
+    @property
+    def is_movie_format(self):
+        return self.image_settings.file_format == "FFMPEG"
+
+    def frame_path(self, frame=0):
+        if self.is_movie_format:
+            return self.filepath + "0001-0100.mp4"
+        return self.filepath + "%04d.png" % frame
+
+class Scene(ID):
+    def __init__(self):
+        self.node_tree = new_node_tree()
+        self.render = Render()
+        self.collection = Struct(children=[], objects=[])
+        self.world = None
+        self.frame_start, self.frame_end, self.frame_step = 1, 250, 1
+        self.frame_current = 1
+        self.keying = Struct(render_mask=False, auto_frames=False, showing_mask=False, render_priority=0,
+            clip_path="", clip_name="", clip_settings="")
+        self.keying_global = Struct(output_path="", input_path="", force_render=False, scene_namespace="",
+            rendering_all=False, active_clip_index=-1, auto_backup=False, recursive_scan=False,
+            single_pass_mask=False, scene_copy_mode="FULL_COPY", queue_order="NAME",
+            chunk_size=0, max_loaded_clips=16, prefetch_size=256,
+            backup_count=5, backup_compress=True, preview_step=10, preview_frames="", preview_resolution=25,
+            mask_stats=False, mask_threshold=0.01, mask_crop_padding=16,
+            verify_output=False, verify_decode=False, keyframe_rule="NONE", keyframe_interval=25, keyframe_threshold=0.1,
+            output_profiles=PropCollection(lambda: Struct(name="", video_format="PNG", video_depth="8",
+                png_compression=15, exr_codec="DWAA", exr_half=True, movie_codec="H264", movie_quality="HIGH",
+                mask_format="PNG", mask_depth="8")),
+            auto_proxies=False, proxy_25=True, proxy_50=False, proxy_workers=2)
+        self.clip_list = PropCollection(lambda: Struct(clip_name="", path="", icon="HIDE_ON",
+            frame_count=0, fps=0.0, resolution=(0, 0), codec=""))
+        self.clip_list_index = 0
+        self.tracking_local = Struct(tracker_name="", tracking_multiplier=1.0, track_selection="ALL",
+            export_axes="XY", export_format="CSV")
+
+    def frame_set(self, frame):
+        self.frame_current = frame
+
+    def copy(self):
+        scene = Scene.__new__(Scene)
+        scene.__dict__.update(copy.deepcopy({k: v for k, v in self.__dict__.items()
+            if k not in ("id_collection", "_name")}))
+        return data.scenes.link(scene, self.name)
+
+class Markers:
+    """Marker collection backed by NumPy arrays, foreach_get copies them like the real API."""
+
+    def __init__(self, frames, coords, mute):
+        self.arrays = {"frame": frames, "co": coords, "mute": mute}
+
+    def __len__(self):
+        return len(self.arrays["frame"])
+
+    def foreach_get(self, attr, out):
+        out[:] = self.arrays[attr].ravel()
+
+class Tracks(list):
+    def get(self, name, default=None):
+        for track in self:
+            if track.name == name:
+                return track
+        return default
+
+class MovieClip(ID):
+    def __init__(self, filepath, frame_duration=250):
+        self.filepath = filepath
+        self.user_count = 0
+        self.frame_duration = frame_duration
+        self.frame_start = 1
+        self.frame_offset = 0
+        self.colorspace_settings = Struct(name="sRGB")
+        self.tracking = Struct(tracks=Tracks(), plane_tracks=[], objects=[Struct(name="Camera")],
+            stabilization=Struct(use_2d_stabilization=False), camera=Struct())
+
+    @property
+    def users(self):
+        return self.user_count
+
+class MovieClips(IDCollection):
+    def load(self, filepath, check_existing=False):
+        return self.link(MovieClip(filepath), os.path.basename(filepath))
+
+class Scenes(IDCollection):
+    def new(self, name):
+        return self.link(Scene(), name)
+
+def batch_remove(ids):
+    for item in list(ids):
+        item.id_collection.remove(item)
+
+data = types.SimpleNamespace(scenes=Scenes(), movieclips=MovieClips(), filepath="", batch_remove=batch_remove)
+
+
+#----------------------------------------
+#   MODULE
+#----------------------------------------
+def prop(*args, **kwargs):
+    return (args, kwargs)
+
+class Timers:
+    def __init__(self):
+        self.functions = []
+
+    def register(self, function, first_interval=0):
+        self.functions.append(function)
+
+    def unregister(self, function):
+        self.functions.remove(function)
+
+    def is_registered(self, function):
+        return function in self.functions
+
+class WindowManager:
+    def event_timer_add(self, time_step, window=None):
+        return object()
+
+    def event_timer_remove(self, timer):
+        pass
+
+    def modal_handler_add(self, operator):
+        pass
+
+class Context:
+    def __init__(self):
+        self.window = Struct(scene=None)
+        self.window_manager = WindowManager()
+        self.space_data = Struct(clip=None)
+
+    @property
+    def scene(self):
+        return self.window.scene
+
+def scene_new(override=None, type="FULL_COPY"):
+    template = override["scene"] if override else context.window.scene
+    context.window.scene = template.copy()
+    return {"FINISHED"}
+
+def install():
+    """Creates a fresh bpy stand-in and registers it in sys.modules, returns it."""
+    global data, context
+    data = types.SimpleNamespace(scenes=Scenes(), movieclips=MovieClips(), filepath="", batch_remove=batch_remove)
+    context = Context()
+    bpy = types.ModuleType("bpy")
+    bpy.data = data
+    bpy.context = context
+    bpy.types = types.SimpleNamespace(Operator=Struct, Panel=Struct, PropertyGroup=Struct, UIList=Struct,
+        Scene=Scene, UI_UL_list=Struct, Node=Struct)
+    bpy.props = types.SimpleNamespace(**{name: prop for name in ("BoolProperty", "IntProperty",
+        "FloatProperty", "StringProperty", "EnumProperty", "PointerProperty", "CollectionProperty",
+        "IntVectorProperty")})
+    bpy.utils = types.SimpleNamespace(register_class=lambda cls: None, unregister_class=lambda cls: None)
+    bpy.path = types.SimpleNamespace(abspath=lambda path: path[2:] if path.startswith("//") else path)
+    bpy.app = types.SimpleNamespace(binary_path="blender", timers=Timers(),
+        handlers=types.SimpleNamespace(render_complete=[], render_cancel=[], render_write=[],
+            depsgraph_update_post=[], load_post=[], undo_post=[], redo_post=[],
+            persistent=lambda function: function))
+    bpy.ops = types.SimpleNamespace(
+        scene=types.SimpleNamespace(new=scene_new),
+        render=types.SimpleNamespace(render=lambda *args, **kwargs: {"FINISHED"}),
+        keying=types.SimpleNamespace(),
+        wm=types.SimpleNamespace(save_as_mainfile=lambda **kwargs: {"FINISHED"},
+            save_mainfile=lambda **kwargs: {"FINISHED"}))
+    sys.modules["bpy"] = bpy
+    sys.modules["bpy.app"] = bpy.app
+    sys.modules["bpy.app.handlers"] = bpy.app.handlers
+    return bpy
+
+def new_track(name, marker_count, seed=0):
+    """Returns a track with marker_count markers moving randomly, every 50th marker is disabled."""
+    rng = np.random.default_rng(seed)
+    frames = np.arange(1, marker_count + 1, dtype=np.int32)
+    coords = (np.cumsum(rng.normal(0, 0.001, (marker_count, 2)), axis=0) + 0.5).astype(np.float32)
+    mute = np.zeros(marker_count, dtype=bool)
+    mute[::50] = True
+    return Struct(name=name, select=True, markers=Markers(frames, coords, mute),
+        use_2d_stabilization=False, use_2d_stabilization_rotation=False)
@@ -0,0 +1,234 @@
+"""Times the hot paths of the batch pipeline against a synthetic workload, without Blender.
+
+The add-on is imported on top of the bpy stand-in from fake_bpy.py, then each benchmark is run
+for a range of workload sizes, so both the timings and their scaling can be compared between
+revisions. Run from the repository root (requires NumPy):
+
+    python benchmarks/run_benchmarks.py [--scale 1.0] [--repeat 3] [--json results.json]
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import importlib
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import fake_bpy
+
+
+#Valid 1x1 PNG used as an already rendered frame
+PNG_FRAME = bytes.fromhex("89504e470d0a1a0a0000000d4948445200000001000000010806000000"
+    "1f15c4890000000d4944415478da63f8cfc0f01f0005000201a1e3d3a90000000049454e44ae426082")
+
+
+def load_addon():
+    """Installs a fresh bpy stand-in and (re)imports the add-on on top of it."""
+    bpy = fake_bpy.install()
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    if root not in sys.path:
+        sys.path.insert(0, root)
+    for name in [name for name in sys.modules if name == "src" or name.startswith("src.")]:
+        del sys.modules[name]
+    addon = importlib.import_module("src")
+    return bpy, addon.keying_module, addon.tracking_module, importlib.import_module("src.state_machine")
+
+def setup_workspace(bpy, keying_module, workdir, clip_count):
+    """Creates clip_count empty clip files and points the master scene to them."""
+    input_path = os.path.join(workdir, "clips") + os.path.sep
+    output_path = os.path.join(workdir, "output") + os.path.sep
+    os.makedirs(input_path, exist_ok=True)
+    os.makedirs(output_path, exist_ok=True)
+    for i in range(clip_count):
+        open(os.path.join(input_path, "clip_%05d%s" % (i, ".mp4" if i % 3 else ".MOV")), "wb").close()
+
+    bpy.context.window.scene = bpy.data.scenes.new("Scene")
+    global_props = keying_module.get_master_scene().keying_global
+    global_props.input_path = input_path
+    global_props.output_path = output_path
+    global_props.scene_namespace = "bench"
+    return input_path, output_path
+
+def measure(function, repeat):
+    """Returns the best wall time of the function out of repeat runs (setup is excluded)."""
+    best = None
+    for i in range(repeat):
+        run = function()
+        start = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+#----------------------------------------
+#   BENCHMARKS
+#----------------------------------------
+def bench_load_clip_collection(size, repeat, workdir):
+    """Scanning an input folder with size clips, cold (new index) and warm (unchanged folder)."""
+    results = {}
+    def cold():
+        bpy, keying_module, tracking_module, state_machine = load_addon()
+        shutil.rmtree(workdir, ignore_errors=True)
+        input_path, output_path = setup_workspace(bpy, keying_module, workdir, size)
+        return lambda: keying_module.load_clip_collection(bpy.context, input_path)
+    results["cold"] = measure(cold, repeat)
+
+    def warm():
+        bpy, keying_module, tracking_module, state_machine = load_addon()
+        input_path, output_path = setup_workspace(bpy, keying_module, workdir, size)
+        keying_module.load_clip_collection(bpy.context, input_path)
+        return lambda: keying_module.load_clip_collection(bpy.context, input_path)
+    results["warm"] = measure(warm, repeat)
+    return results
+
+def bench_switch_clip(size, repeat, workdir):
+    """Visiting size clips (creating their scenes), then visiting all of them again."""
+    results = {}
+    def prepare():
+        bpy, keying_module, tracking_module, state_machine = load_addon()
+        shutil.rmtree(workdir, ignore_errors=True)
+        input_path, output_path = setup_workspace(bpy, keying_module, workdir, size)
+        keying_module.load_clip_collection(bpy.context, input_path)
+        return bpy, keying_module
+
+    def first_visit():
+        bpy, keying_module = prepare()
+        return lambda: [keying_module.switch_clip(bpy.context, i) for i in range(size)]
+    results["create"] = measure(first_visit, repeat)
+
+    def second_visit():
+        bpy, keying_module = prepare()
+        for i in range(size):
+            keying_module.switch_clip(bpy.context, i)
+        return lambda: [keying_module.switch_clip(bpy.context, i) for i in range(size)]
+    results["revisit"] = measure(second_visit, repeat)
+    return results
+
+def bench_namespace_scenes(size, repeat, workdir):
+    """Creating the scenes of size clips at once (linked copies), then deleting the whole namespace."""
+    results = {}
+    def prepare():
+        bpy, keying_module, tracking_module, state_machine = load_addon()
+        shutil.rmtree(workdir, ignore_errors=True)
+        input_path, output_path = setup_workspace(bpy, keying_module, workdir, size)
+        keying_module.load_clip_collection(bpy.context, input_path)
+        keying_module.switch_clip(bpy.context, 0)
+        keying_module.get_master_scene().keying_global.scene_copy_mode = "LINK_COPY"
+        return bpy, keying_module
+
+    def create():
+        bpy, keying_module = prepare()
+        return lambda: keying_module.create_namespace_scenes(bpy.context, bpy.context.window.scene)
+    results["create"] = measure(create, repeat)
+
+    def delete():
+        bpy, keying_module = prepare()
+        keying_module.create_namespace_scenes(bpy.context, bpy.context.window.scene)
+        return lambda: keying_module.delete_namespace_scenes(bpy.context, "bench")
+    results["delete"] = measure(delete, repeat)
+    return results
+
+def bench_filter_scenes(size, repeat, workdir):
+    """Filtering a namespace out of size scenes (a quarter of them in the namespace), 100 times."""
+    def prepare():
+        bpy, keying_module, tracking_module, state_machine = load_addon()
+        for i in range(size):
+            bpy.data.scenes.new("%s/clip_%05d.mp4" % ("bench" if i % 4 == 0 else "other", i))
+        return lambda: [state_machine.filter_scenes("bench") for i in range(100)]
+    return {"100 calls": measure(prepare, repeat)}
+
+def bench_state_machine(size, repeat, workdir, frames=20):
+    """Running the Render All state loop over size scenes whose frames are all rendered already,
+    cold (frames validated from disk) and warm (frames known from the render manifests)."""
+    results = {}
+    def prepare(warm):
+        bpy, keying_module, tracking_module, state_machine = load_addon()
+        shutil.rmtree(workdir, ignore_errors=True)
+        input_path, output_path = setup_workspace(bpy, keying_module, workdir, size)
+        keying_module.load_clip_collection(bpy.context, input_path)
+        for i in range(size):
+            keying_module.switch_clip(bpy.context, i)
+            bpy.context.scene.frame_end = frames
+            video_path = os.path.join(keying_module.get_output_clip_path(bpy.context), "video")
+            os.makedirs(video_path)
+            for frame in range(1, frames + 1):
+                with open(os.path.join(video_path, "%04d.png" % frame), "wb") as file:
+                    file.write(PNG_FRAME)
+
+        operator = fake_bpy.Struct(report=lambda *args: None)
+        bpy.ops.keying.render_current = lambda: keying_module.RenderOperator.execute(operator, bpy.context)
+        owner = fake_bpy.Struct(remove_timer=lambda context: None)
+        global_props = keying_module.get_master_scene().keying_global
+        def run():
+            machine = state_machine.StateMachine(keying_module.BeginState(), owner, global_props)
+            result = machine.update(bpy.context)
+            assert "FINISHED" in result
+        if warm:
+            run()
+        return run
+    results["cold"] = measure(lambda: prepare(False), repeat)
+    results["warm"] = measure(lambda: prepare(True), repeat)
+    return results
+
+def bench_tracking_export(size, repeat, workdir, track_count=50):
+    """Exporting track_count tracks with size markers each (CSV and binary)."""
+    results = {}
+    for export_format in ("CSV", "BIN"):
+        def prepare():
+            bpy, keying_module, tracking_module, state_machine = load_addon()
+            shutil.rmtree(workdir, ignore_errors=True)
+            setup_workspace(bpy, keying_module, workdir, 0)
+            clip = bpy.data.movieclips.load(os.path.join(workdir, "tracked.mp4"))
+            clip.tracking.tracks.extend(fake_bpy.new_track("Track.%03d" % i, size, i) for i in range(track_count))
+            bpy.context.space_data.clip = clip
+            bpy.context.scene.tracking_local.export_format = export_format
+            operator = fake_bpy.Struct(report=lambda *args: None)
+            return lambda: tracking_module.export_tracking_data(operator, bpy.context)
+        results[export_format] = measure(prepare, repeat)
+    return results
+
+benchmarks = [
+    ("load_clip_collection", bench_load_clip_collection, [100, 1000, 5000]),
+    ("switch_clip", bench_switch_clip, [50, 200, 800]),
+    ("namespace_scenes", bench_namespace_scenes, [50, 200, 800]),
+    ("filter_scenes", bench_filter_scenes, [100, 1000, 5000]),
+    ("state_machine", bench_state_machine, [25, 100, 400]),
+    ("export_tracking_data", bench_tracking_export, [500, 2000, 5000]),
+]
+
+
+#----------------------------------------
+#   MAIN
+#----------------------------------------
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiplies all workload sizes")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement (the best is reported)")
+    parser.add_argument("--only", help="Run only the benchmarks whose name contains this text")
+    parser.add_argument("--json", help="Also write the results into this JSON file")
+    args = parser.parse_args()
+
+    results = []
+    workdir = tempfile.mkdtemp(prefix="keying_bench_")
+    try:
+        print("%-22s %-10s %8s %12s %14s" % ("benchmark", "case", "size", "time [ms]", "per item [us]"))
+        for name, function, sizes in benchmarks:
+            if args.only and args.only not in name:
+                continue
+            for size in sizes:
+                size = max(1, int(size * args.scale))
+                for case, seconds in function(size, args.repeat, os.path.join(workdir, name)).items():
+                    results.append({"benchmark": name, "case": case, "size": size, "seconds": seconds})
+                    print("%-22s %-10s %8d %12.2f %14.2f" % (name, case, size, seconds * 1e3, seconds * 1e6 / size))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(results, file, indent=1)
+
+if __name__ == "__main__":
+    main()
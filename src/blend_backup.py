@@ -0,0 +1,94 @@
+import bpy
+import os
+import glob
+import gzip
+import json
+import shutil
+import hashlib
+import datetime
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+
+BACKUP_PATTERN = "keying_backup_*.blend"
+#Stores the hashes of the backups in the backup folder
+INDEX_NAME = ".keying_backups.json"
+
+executor = None
+
+
+def get_file_hash(path):
+    digest = hashlib.sha1()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(2**20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def load_index(folder):
+    try:
+        with open(os.path.join(folder, INDEX_NAME)) as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {}
+
+def save_index(folder, index):
+    path = os.path.join(folder, INDEX_NAME)
+    with open(path + ".tmp", "w") as file:
+        json.dump(index, file)
+    os.replace(path + ".tmp", path)
+
+def remove_old_backups(folder, index, keep):
+    """Removes all but the keep newest backups from the folder (the backup names are timestamps)."""
+    if keep <= 0:
+        return
+    for path in sorted(glob.glob(os.path.join(folder, BACKUP_PATTERN)))[:-keep]:
+        os.remove(path)
+        index.pop(os.path.basename(path), None)
+
+def store_backup(temp_path, folder, backup_name, compress, keep):
+    """Copies the saved blend file into the backup folder (optionally gzip compressed, which Blender
+    opens directly) and removes the old backups. The copy is skipped if an identical backup
+    is already kept. Runs in a background thread, returns the path of the backup or None."""
+    try:
+        digest = get_file_hash(temp_path)
+        index = {name: file_hash for name, file_hash in load_index(folder).items()
+            if os.path.exists(os.path.join(folder, name))}
+        if digest in index.values():
+            print("KEYING BACKUP: the blend file did not change since the last backup")
+            return None
+        path = os.path.join(folder, backup_name)
+        open_backup = (lambda path: gzip.open(path, "wb", compresslevel=1)) if compress else \
+            (lambda path: open(path, "wb"))
+        with open(temp_path, "rb") as source, open_backup(path + ".tmp") as target:
+            shutil.copyfileobj(source, target, 2**20)
+        os.replace(path + ".tmp", path)
+        index[backup_name] = digest
+        remove_old_backups(folder, index, keep)
+        save_index(folder, index)
+        print("KEYING BACKUP: saved %s" % path)
+        return path
+    except OSError as error:
+        print("KEYING BACKUP FAILED: %s" % error)
+        return None
+    finally:
+        os.remove(temp_path)
+
+def backup_blend_file(folder, compress=True, keep=5):
+    """Saves a copy of the open blend file into a local temporary file (the open file stays unchanged)
+    and copies it into the given folder in a background thread, so the render can start right away.
+    Relative paths are kept relative to the original blend file location."""
+    global executor
+    file, temp_path = tempfile.mkstemp(suffix=".blend")
+    os.close(file)
+    bpy.ops.wm.save_as_mainfile(filepath=temp_path, copy=True, compress=False, relative_remap=False)
+    backup_name = datetime.datetime.now().strftime("keying_backup_%Y-%m-%d_%H-%M-%S.blend")
+    if executor is None:
+        executor = ThreadPoolExecutor(max_workers=1)
+    return executor.submit(store_backup, temp_path, folder, backup_name, compress, keep)
+
+def shutdown():
+    """Lets the running backups finish in the background."""
+    global executor
+    if executor is not None:
+        executor.shutdown(wait=False)
+        executor = None
@@ -0,0 +1,53 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+
+#Size of the blocks read while prefetching and of the file end read for containers with the index at the end
+BLOCK_SIZE = 2**20
+
+executor = None
+future = None
+last_path = None
+
+
+def prefetch_file(path, max_bytes):
+    """Reads up to max_bytes of the beginning and the last block of the file, so they get
+    into the OS file cache. Where supported, the OS is also asked to read the file ahead."""
+    try:
+        with open(path, "rb", buffering=0) as file:
+            size = os.fstat(file.fileno()).st_size
+            if hasattr(os, "posix_fadvise"):
+                os.posix_fadvise(file.fileno(), 0, min(size, max_bytes), os.POSIX_FADV_WILLNEED)
+            buffer = bytearray(BLOCK_SIZE)
+            read_bytes = 0
+            while read_bytes < max_bytes:
+                count = file.readinto(buffer)
+                if not count:
+                    break
+                read_bytes += count
+            if size > read_bytes:
+                file.seek(max(read_bytes, size - BLOCK_SIZE))
+                file.readinto(buffer)
+    except OSError:
+        pass
+
+def prefetch(path, max_bytes):
+    """Starts prefetching the file in a background thread. The file which was prefetched last is
+    not read again, a prefetch which did not start yet is replaced by the new one."""
+    global executor, future, last_path
+    if path == last_path:
+        return
+    if executor is None:
+        executor = ThreadPoolExecutor(max_workers=1)
+    if future is not None:
+        future.cancel()
+    last_path = path
+    future = executor.submit(prefetch_file, path, max_bytes)
+
+def shutdown():
+    global executor, future, last_path
+    if executor is not None:
+        executor.shutdown(wait=False)
+        executor = None
+    future = None
+    last_path = None
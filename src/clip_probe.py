@@ -0,0 +1,155 @@
+import os
+import json
+import shutil
+import struct
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+
+#Containers which can be read without ffprobe
+mp4_exts = frozenset({".mov", ".mp4"})
+
+executor = None
+pending = {}
+
+
+#----------------------------------------
+#   MP4 / QUICKTIME
+#----------------------------------------
+def read_boxes(file, start, end):
+    """Yields (type, payload start, box end) of the MP4 boxes between start and end."""
+    pos = start
+    while pos + 8 <= end:
+        file.seek(pos)
+        size, box_type = struct.unpack(">I4s", file.read(8))
+        header_size = 8
+        if size == 1:
+            size = struct.unpack(">Q", file.read(8))[0]
+            header_size = 16
+        elif size == 0:
+            size = end - pos
+        if size < header_size:
+            return
+        yield box_type, pos + header_size, pos + size
+        pos += size
+
+def find_box(file, start, end, path):
+    """Returns (payload start, box end) of the box at the given path of box types, or None."""
+    for box_type, payload, box_end in read_boxes(file, start, end):
+        if box_type == path[0]:
+            if len(path) == 1:
+                return payload, box_end
+            return find_box(file, payload, box_end, path[1:])
+    return None
+
+def probe_mp4(path):
+    """Reads the metadata of the first video track of a MP4/QuickTime file."""
+    with open(path, "rb") as file:
+        moov = find_box(file, 0, os.path.getsize(path), [b"moov"])
+        if moov is None:
+            return None
+        for box_type, trak, trak_end in read_boxes(file, *moov):
+            if box_type != b"trak":
+                continue
+            hdlr = find_box(file, trak, trak_end, [b"mdia", b"hdlr"])
+            if hdlr is None:
+                continue
+            file.seek(hdlr[0] + 8)
+            if file.read(4) != b"vide":
+                continue
+
+            tkhd = find_box(file, trak, trak_end, [b"tkhd"])
+            file.seek(tkhd[0])
+            file.seek(tkhd[0] + (88 if file.read(1) == b"\x01" else 76))
+            width, height = struct.unpack(">II", file.read(8))
+
+            mdhd = find_box(file, trak, trak_end, [b"mdia", b"mdhd"])
+            file.seek(mdhd[0])
+            if file.read(1) == b"\x01":
+                file.seek(mdhd[0] + 20)
+                timescale, duration = struct.unpack(">IQ", file.read(12))
+            else:
+                file.seek(mdhd[0] + 12)
+                timescale, duration = struct.unpack(">II", file.read(8))
+
+            stbl = find_box(file, trak, trak_end, [b"mdia", b"minf", b"stbl"])
+            stts = find_box(file, stbl[0], stbl[1], [b"stts"])
+            file.seek(stts[0] + 4)
+            entry_count = struct.unpack(">I", file.read(4))[0]
+            entries = struct.unpack(">%dI" % (entry_count * 2), file.read(entry_count * 8))
+            frame_count = sum(entries[0::2])
+            stsd = find_box(file, stbl[0], stbl[1], [b"stsd"])
+            file.seek(stsd[0] + 12)
+            codec = file.read(4).decode("latin-1").strip()
+
+            fps = frame_count * timescale / duration if duration else 0.0
+            return {"frame_count": frame_count, "fps": round(fps, 3),
+                "resolution": [width >> 16, height >> 16], "codec": codec}
+    return None
+
+
+#----------------------------------------
+#   FFPROBE
+#----------------------------------------
+def probe_ffprobe(path):
+    """Reads the metadata of the first video stream using ffprobe (if it is installed)."""
+    ffprobe = shutil.which("ffprobe")
+    if ffprobe is None:
+        return None
+    result = subprocess.run([ffprobe, "-v", "error", "-select_streams", "v:0",
+        "-show_entries", "stream=nb_frames,r_frame_rate,width,height,codec_name,duration",
+        "-of", "json", path], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    if result.returncode != 0:
+        return None
+    streams = json.loads(result.stdout.decode()).get("streams")
+    if not streams:
+        return None
+    stream = streams[0]
+    num, _, den = stream.get("r_frame_rate", "0/1").partition("/")
+    fps = float(num) / float(den or 1) if float(den or 1) else 0.0
+    frame_count = int(stream.get("nb_frames") or round(float(stream.get("duration") or 0) * fps))
+    return {"frame_count": frame_count, "fps": round(fps, 3),
+        "resolution": [stream.get("width", 0), stream.get("height", 0)],
+        "codec": stream.get("codec_name", "")}
+
+
+#----------------------------------------
+#   THREAD POOL
+#----------------------------------------
+def probe_clip(path):
+    """Returns the metadata (frame count, fps, resolution, codec) of the given clip,
+    or None if it could not be read."""
+    try:
+        if os.path.splitext(path)[1].lower() in mp4_exts:
+            metadata = probe_mp4(path)
+            if metadata is not None:
+                return metadata
+        return probe_ffprobe(path)
+    except (OSError, ValueError, TypeError, struct.error):
+        return None
+
+def probe_clips(paths, max_workers=8):
+    """Starts probing the given clip paths in a background thread pool.
+    Clips that are already being probed are skipped."""
+    global executor
+    if executor is None:
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+    for path in paths:
+        if path not in pending:
+            pending[path] = executor.submit(probe_clip, path)
+
+def collect_results():
+    """Returns the {path: metadata} of the finished probes, metadata is None for unreadable clips."""
+    results = {}
+    for path, future in list(pending.items()):
+        if future.done():
+            del pending[path]
+            results[path] = future.result()
+    return results
+
+def shutdown():
+    global executor
+    if executor is not None:
+        executor.shutdown(wait=False)
+        executor = None
+    pending.clear()
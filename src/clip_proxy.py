@@ -0,0 +1,133 @@
+import os
+import json
+import shutil
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+
+#Records the source file the proxies of a clip were built from
+STAMP_NAME = "keying_proxy.json"
+
+executor = None
+executor_workers = 0
+pending = {}
+processes = set()
+lock = threading.Lock()
+
+
+def get_proxy_folder(path):
+    """Returns the folder Blender looks for the proxies of the clip in (BL_proxy/<clip file> next to the clip)."""
+    folder, file_name = os.path.split(path)
+    return os.path.join(folder, "BL_proxy", file_name)
+
+def get_proxy_path(path, size):
+    return os.path.join(get_proxy_folder(path), "proxy_%d.avi" % size)
+
+def get_built_sizes(path):
+    """Returns the proxy sizes (in percent) built from the current version of the clip file,
+    an empty list if the clip file changed since, or None if no proxies were built for it."""
+    try:
+        stat = os.stat(path)
+        with open(os.path.join(get_proxy_folder(path), STAMP_NAME)) as file:
+            stamp = json.load(file)
+    except (OSError, ValueError):
+        return None
+    if stamp.get("source") != [stat.st_size, stat.st_mtime_ns]:
+        return []
+    return [size for size in stamp.get("sizes", []) if os.path.exists(get_proxy_path(path, size))]
+
+def run_ffmpeg(command):
+    """Runs ffmpeg as a background process which can be terminated by shutdown(), returns its exit code."""
+    with lock:
+        if executor is None:
+            return -1
+        process = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        processes.add(process)
+    try:
+        return process.wait()
+    finally:
+        with lock:
+            processes.discard(process)
+
+def build_proxy(path, sizes):
+    """Builds the missing or outdated proxies of the given sizes (in percent) for the clip as MJPEG
+    AVI files, in the layout Blender reads them from. Returns the list of built sizes,
+    or None if ffmpeg is not installed or failed."""
+    #Checked here, as the clips can be on a slow network share
+    built_sizes = get_built_sizes(path) or []
+    if set(sizes) <= set(built_sizes):
+        return sorted(built_sizes)
+    ffmpeg = shutil.which("ffmpeg")
+    if ffmpeg is None:
+        return None
+    try:
+        stat = os.stat(path)
+        folder = get_proxy_folder(path)
+        os.makedirs(folder, exist_ok=True)
+        for size in sizes:
+            if size in built_sizes:
+                continue
+            proxy_path = get_proxy_path(path, size)
+            temp_path = proxy_path[:-len(".avi")] + "_part.avi"
+            scale = "scale=trunc(iw*%d/100):trunc(ih*%d/100)" % (size, size)
+            exit_code = run_ffmpeg([ffmpeg, "-v", "error", "-y", "-i", path, "-map", "0:v:0", "-an", "-sn",
+                "-vsync", "passthrough", "-vf", scale, "-c:v", "mjpeg", "-q:v", "3",
+                "-pix_fmt", "yuvj420p", "-f", "avi", temp_path])
+            if exit_code != 0:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+                return None
+            os.replace(temp_path, proxy_path)
+            built_sizes.append(size)
+        with open(os.path.join(folder, STAMP_NAME), "w") as file:
+            json.dump({"source": [stat.st_size, stat.st_mtime_ns], "sizes": sorted(built_sizes)}, file)
+        return sorted(built_sizes)
+    except OSError:
+        return None
+
+
+#----------------------------------------
+#   PROCESS POOL
+#----------------------------------------
+def build_proxies(paths, sizes, max_workers=2):
+    """Starts building the proxies of the given clips, with at most max_workers ffmpeg processes
+    running at once. Clips already being built are skipped, the up to date ones are skipped by the workers.
+    If max_workers changed, the waiting builds move to a new pool (the running ones finish in the old one)."""
+    global executor, executor_workers
+    with lock:
+        old_executor = executor if executor_workers != max_workers else None
+        if executor is None or old_executor is not None:
+            executor = ThreadPoolExecutor(max_workers=max_workers)
+            executor_workers = max_workers
+    if old_executor is not None:
+        old_executor.shutdown(wait=False)
+        for path, future in list(pending.items()):
+            if future.cancel():
+                pending[path] = executor.submit(build_proxy, path, sizes)
+    for path in paths:
+        if path not in pending:
+            pending[path] = executor.submit(build_proxy, path, sizes)
+
+def collect_results():
+    """Returns the {path: built sizes} of the finished builds, built sizes are None for failed builds."""
+    results = {}
+    for path, future in list(pending.items()):
+        if future.done():
+            del pending[path]
+            results[path] = future.result()
+    return results
+
+def shutdown():
+    """Cancels the waiting builds and terminates the running ffmpeg processes."""
+    global executor, executor_workers
+    with lock:
+        if executor is not None:
+            executor.shutdown(wait=False)
+            executor = None
+            executor_workers = 0
+        for process in processes:
+            process.terminate()
+    for future in pending.values():
+        future.cancel()
+    pending.clear()
@@ -0,0 +1,171 @@
+import bpy
+import os
+import json
+from collections import OrderedDict
+from bpy.app.handlers import persistent
+
+from . import scene_index
+from . import render_cache
+
+
+#Names of the loaded movie clips in the order they were used (least recently used first)
+usage = OrderedDict()
+#Names of the clips which hold user data, so only their cached frames were freed
+freed = set()
+#Names of the scenes whose compositor uses each clip, recorded as the clips are used
+clip_scenes = {}
+#Whether the clips loaded before (e.g. with the blend file) were added to the usage
+seeded = False
+
+
+def has_clip_data(clip):
+    """Returns whether the clip holds user data which would be lost by removing it
+    (tracks, stabilization or changed frame settings). Its colorspace and camera settings
+    are stored with the scenes using it instead (see get_clip_settings)."""
+    tracking = clip.tracking
+    return (len(tracking.tracks) > 0 or len(tracking.plane_tracks) > 0 or len(tracking.objects) > 1
+        or tracking.stabilization.use_2d_stabilization
+        or clip.frame_start != 1 or clip.frame_offset != 0)
+
+def get_node_users(clip):
+    """Returns the (scene, nodes) pairs of the scenes whose compositor uses the clip.
+    Only the scenes recorded as the clip's users are checked, if another scene uses the clip
+    too, there are less nodes than the clip's users and the clip is not removed."""
+    users = []
+    for scene_name in clip_scenes.get(clip.name, ()):
+        scene = scene_index.get_scene(scene_name)
+        if scene is None or scene.node_tree is None:
+            continue
+        nodes = [node for node in scene.node_tree.nodes if getattr(node, "clip", None) == clip]
+        if nodes:
+            users.append((scene, nodes))
+    return users
+
+def get_clip_settings(clip, nodes):
+    """Returns the settings of the clip which are lost by removing it (colorspace, camera intrinsics
+    and distortion) and the names of the given nodes using it, as a JSON string."""
+    return json.dumps({"colorspace": clip.colorspace_settings.name,
+        "camera": dict(render_cache.get_rna_values(clip.tracking.camera)),
+        "nodes": [node.name for node in nodes]})
+
+def apply_clip_settings(clip, settings):
+    """Sets the colorspace and camera settings (as returned by get_clip_settings) of the loaded clip."""
+    clip.colorspace_settings.name = settings["colorspace"]
+    camera = clip.tracking.camera
+    for name, value in settings["camera"].items():
+        prop = camera.bl_rna.properties.get(name)
+        if prop is not None and not prop.is_readonly:
+            setattr(camera, name, value)
+
+def free_clip(clip):
+    """Frees the cached frames of the clip (reassigning the file path reloads it lazily)."""
+    clip.filepath = clip.filepath
+
+def unload_clip(clip):
+    """Removes the clip if it is only used by the compositors of the scenes and does not hold
+    any user data, the scenes remember its path, its settings and the nodes using it to load it again.
+    Otherwise only its cached frames are freed. Returns whether the clip was removed."""
+    users = get_node_users(clip)
+    if has_clip_data(clip) or clip.users > sum(len(nodes) for scene, nodes in users):
+        free_clip(clip)
+        return False
+    path = bpy.path.abspath(clip.filepath)
+    for scene, nodes in users:
+        if not scene.keying.clip_path:
+            scene.keying.clip_path = path
+        scene.keying.clip_settings = get_clip_settings(clip, nodes)
+        #All users of the clip are known, so the removal does not need to search all data for them
+        for node in nodes:
+            node.clip = None
+    clip_scenes.pop(clip.name, None)
+    bpy.data.movieclips.remove(clip, do_unlink=False)
+    return True
+
+def seed():
+    """Adds the clips loaded before (e.g. with the blend file) as the least recently used ones
+    and records the scenes using them, in a single pass over the scenes."""
+    global seeded
+    seeded = True
+    for loaded_clip in bpy.data.movieclips:
+        if loaded_clip.name not in usage and loaded_clip.name not in freed:
+            usage[loaded_clip.name] = None
+            usage.move_to_end(loaded_clip.name, last=False)
+    for scene in bpy.data.scenes:
+        if scene.node_tree is None:
+            continue
+        for node in scene.node_tree.nodes:
+            clip = getattr(node, "clip", None)
+            if clip is not None:
+                clip_scenes.setdefault(clip.name, set()).add(scene.name)
+
+def touch(clip, max_loaded):
+    """Marks the clip as the most recently used one and unloads the least recently used clips
+    above the max_loaded limit. Clips loaded before (e.g. with the blend file) count as least recently used."""
+    if not seeded:
+        seed()
+    freed.discard(clip.name)
+    usage[clip.name] = None
+    usage.move_to_end(clip.name)
+
+    while len(usage) > max(1, max_loaded):
+        clip_name, _ = usage.popitem(last=False)
+        old_clip = bpy.data.movieclips.get(clip_name)
+        if old_clip is not None and not unload_clip(old_clip):
+            freed.add(clip_name)
+
+def get_clip_name(clip_name):
+    """Returns the datablock name of the clip given by its "/" separated path relative to the input folder.
+    Clips in subfolders are named by their whole relative path and a hash of it (a/x.mov -> a_x~<hash>.mov),
+    so clips of the same file name in different subfolders (or of a name like a_x.mov) do not replace
+    each other. Names too long for a datablock are shortened the same way."""
+    if "/" not in clip_name:
+        return scene_index.shorten_name(clip_name)
+    return scene_index.get_hashed_name(clip_name.replace("/", "_"), clip_name)
+
+def load_clip_file(path, name=None):
+    """Loads the clip from the given path into the Blenders clip storage under the given name
+    (the file name by default) and returns it.
+    A clip with the same name is reused if it was loaded from the same path, otherwise it is replaced."""
+    if not name:
+        name = os.path.basename(path)
+    old_clip = bpy.data.movieclips.get(name)
+    if old_clip != None:
+        if os.path.normpath(bpy.path.abspath(old_clip.filepath)) == os.path.normpath(path):
+            return old_clip
+        usage.pop(old_clip.name, None)
+        clip_scenes.pop(old_clip.name, None)
+        bpy.data.movieclips.remove(old_clip)
+    clip = bpy.data.movieclips.load(path)
+    clip.name = name
+    return clip
+
+def get_scene_clip(scene, max_loaded):
+    """Returns the movie clip of the given scene, loading it again if it was unloaded,
+    and marks it as the most recently used one."""
+    nodes = scene.node_tree.nodes
+    clip = nodes["Movie Clip"].clip
+    if clip is None and scene.keying.clip_path:
+        name = get_clip_name(scene.keying.clip_name) if scene.keying.clip_name else None
+        clip = load_clip_file(bpy.path.abspath(scene.keying.clip_path), name)
+        node_names = ["Movie Clip", "Stabilize 2D"]
+        if scene.keying.clip_settings:
+            settings = json.loads(scene.keying.clip_settings)
+            apply_clip_settings(clip, settings)
+            node_names = settings["nodes"]
+        for node_name in node_names:
+            node = nodes.get(node_name)
+            if node is not None:
+                node.clip = clip
+    if clip is not None:
+        clip_scenes.setdefault(clip.name, set()).add(scene.name)
+        touch(clip, max_loaded)
+    return clip
+
+@persistent
+def clear(dummy=None):
+    """Forgets the clip usage when another blend file is loaded."""
+    global seeded
+    usage.clear()
+    freed.clear()
+    clip_scenes.clear()
+    seeded = False
@@ -0,0 +1,67 @@
+import os
+import json
+
+
+INDEX_NAME = ".keying_clips.json"
+
+#Folders which never contain source clips (Blender proxies)
+skipped_folders = frozenset({"BL_proxy"})
+
+
+def scan_clips(path, exts, recursive=False):
+    """Lists the clips in the folder in a single pass, the extensions are matched case-insensitively.
+    Returns {name: (size, mtime)}, where name is the "/" separated path relative to the folder."""
+    clips = {}
+    folders = [("", path)]
+    while folders:
+        prefix, folder = folders.pop()
+        try:
+            entries = os.scandir(folder)
+        except OSError:
+            continue
+        with entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir():
+                        if recursive and entry.name not in skipped_folders and not entry.name.startswith("."):
+                            folders.append((prefix + entry.name + "/", entry.path))
+                    elif os.path.splitext(entry.name)[1].lower() in exts:
+                        stat = entry.stat()
+                        clips[prefix + entry.name] = (stat.st_size, stat.st_mtime_ns)
+                except OSError:
+                    continue
+    return clips
+
+def new_entry(size, mtime):
+    """Returns an index entry of a clip whose metadata was not read yet."""
+    return {"size": size, "mtime": mtime, "frame_count": 0, "fps": 0.0, "resolution": [0, 0]}
+
+def load_index(path):
+    try:
+        with open(os.path.join(path, INDEX_NAME)) as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {}
+
+def save_index(path, index):
+    """Saves the index into the folder, read-only folders are silently skipped."""
+    try:
+        with open(os.path.join(path, INDEX_NAME), "w") as file:
+            json.dump(index, file, indent=1, sort_keys=True)
+    except OSError:
+        pass
+
+def update_index(path, exts, recursive=False):
+    """Scans the folder and updates its on-disk index. Entries of unchanged files (same size and
+    modification time) keep their metadata, new and changed files get an empty entry.
+    Returns the index as {name: entry}, ordered by name."""
+    old_index = load_index(path)
+    index = {}
+    for name, (size, mtime) in sorted(scan_clips(path, exts, recursive).items()):
+        entry = old_index.get(name)
+        if entry is None or entry["size"] != size or entry["mtime"] != mtime:
+            entry = new_entry(size, mtime)
+        index[name] = entry
+    if index != old_index:
+        save_index(path, index)
+    return index
@@ -0,0 +1,190 @@
+import bpy
+import os
+import json
+import shutil
+import numpy as np
+from collections import deque
+from bpy.app.handlers import persistent
+
+from . import matte_stats
+
+
+MANIFEST_NAME = "keyframes.json"
+
+#Width of the downscaled frames compared by the DIFFERENCE rule
+THUMBNAIL_WIDTH = 64
+#Seconds between the updates of the picker while the frames are being rendered
+UPDATE_INTERVAL = 0.2
+
+picker = None
+
+
+def get_thumbnail(pixels):
+    """Returns the luminance of the RGBA pixels downscaled (by averaging blocks of pixels)
+    to about THUMBNAIL_WIDTH pixels wide."""
+    height, width = pixels.shape[:2]
+    factor = max(1, width // THUMBNAIL_WIDTH)
+    small_height, small_width = height // factor, width // factor
+    blocks = pixels[:small_height * factor, :small_width * factor, :3]
+    rgb = blocks.reshape(small_height, factor, small_width, factor, 3).mean(axis=(1, 3))
+    return rgb @ np.array([0.2126, 0.7152, 0.0722], dtype=np.float32)
+
+def get_difference(thumbnail, other):
+    """Returns the mean absolute difference (0-1) of two thumbnails, 1 if their sizes differ."""
+    if other is None or thumbnail.shape != other.shape:
+        return 1.0
+    return float(np.abs(thumbnail - other).mean())
+
+def link_frame(source, target):
+    """Hardlinks the frame file into the keyframe path (copies it where linking is not possible)."""
+    if os.path.exists(target):
+        os.remove(target)
+    try:
+        os.link(source, target)
+    except OSError:
+        shutil.copy2(source, target)
+
+def load_manifest(folder):
+    try:
+        with open(os.path.join(folder, MANIFEST_NAME)) as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {"frames": {}}
+
+def save_manifest(folder, manifest):
+    path = os.path.join(folder, MANIFEST_NAME)
+    with open(path + ".tmp", "w") as file:
+        json.dump(manifest, file, indent=1)
+    os.replace(path + ".tmp", path)
+
+
+class KeyframePicker:
+    """Picks the keyframes of a scene render from its frames as they are written.
+    The INTERVAL rule picks every interval-th frame of the scene's frame range, the DIFFERENCE rule
+    picks the frames whose downscaled luminance differs from the last keyframe by more than
+    the threshold (and at least every interval-th frame, unless the interval is 0).
+    Keyframes are hardlinked into the keyframe folder under the name of the frame and listed
+    in its manifest. Keyframes of frames which are rendered again are picked again."""
+
+    def __init__(self, scene_name, frame_paths, keyframe_path, frames, rule, interval, threshold, force_render):
+        self.scene_name = scene_name
+        self.frame_paths = frame_paths
+        self.keyframe_path = keyframe_path
+        self.remaining = set(frames)
+        self.first_frame = min(frame_paths)
+        self.rule = rule
+        self.interval = interval
+        self.threshold = threshold
+        self.written = deque()
+        #Set when the render is cancelled, the frames written before are still picked
+        self.cancelled = False
+        self.buffer = None
+        self.last_thumbnail = None
+        self.manifest = load_manifest(keyframe_path)
+        settings = {"rule": rule, "interval": interval, "threshold": threshold}
+        if force_render or any(self.manifest.get(name) != value for name, value in settings.items()):
+            self.clear()
+        self.manifest.update(settings)
+        #Continue from the last keyframe before the rendered frames
+        known = [int(frame) for frame in self.manifest["frames"] if int(frame) < min(frames)]
+        self.last_frame = max(known, default=None)
+
+    def clear(self):
+        for entry in self.manifest["frames"].values():
+            path = os.path.join(self.keyframe_path, entry["file"])
+            if os.path.exists(path):
+                os.remove(path)
+        self.manifest = {"frames": {}}
+
+    def frame_written(self, frame):
+        """Called from the render thread, the frame is picked in the next update."""
+        self.written.append(frame)
+
+    def is_keyframe(self, frame, path):
+        """Returns (whether the frame is a keyframe, its difference from the last keyframe)."""
+        if self.rule == "INTERVAL":
+            return (frame - self.first_frame) % max(1, self.interval) == 0, None
+        since_last = frame - self.last_frame if self.last_frame is not None else None
+        pixels, self.buffer = matte_stats.read_pixels(path, self.buffer)
+        thumbnail = get_thumbnail(pixels)
+        if self.last_thumbnail is None and self.last_frame is not None:
+            #Compare with the keyframe picked before this render
+            last_path = os.path.join(self.keyframe_path, self.manifest["frames"][str(self.last_frame)]["file"])
+            if os.path.exists(last_path):
+                self.last_thumbnail = get_thumbnail(matte_stats.read_pixels(last_path, None)[0])
+        difference = get_difference(thumbnail, self.last_thumbnail)
+        is_keyframe = since_last is None or difference > self.threshold or \
+            (self.interval > 0 and since_last >= self.interval)
+        if is_keyframe:
+            self.last_thumbnail = thumbnail
+        return is_keyframe, round(difference, 6)
+
+    def update(self):
+        """Picks the keyframes from the frames written since the last update.
+        Returns whether all of the rendered frames were written."""
+        if not self.written:
+            return not self.remaining
+        frames = self.manifest["frames"]
+        while self.written:
+            frame = self.written.popleft()
+            self.remaining.discard(frame)
+            path = self.frame_paths.get(frame)
+            if path is None or not os.path.exists(path):
+                continue
+            is_keyframe, difference = self.is_keyframe(frame, path)
+            entry = frames.pop(str(frame), None)
+            if is_keyframe:
+                file_name = os.path.basename(path)
+                link_frame(path, os.path.join(self.keyframe_path, file_name))
+                frames[str(frame)] = {"file": file_name, "difference": difference}
+                self.last_frame = frame
+            elif entry is not None and os.path.exists(os.path.join(self.keyframe_path, entry["file"])):
+                os.remove(os.path.join(self.keyframe_path, entry["file"]))
+        self.manifest["frames"] = {str(frame): frames[str(frame)] for frame in sorted(map(int, frames))}
+        save_manifest(self.keyframe_path, self.manifest)
+        return not self.remaining
+
+
+#----------------------------------------
+#   RENDER HOOKS
+#----------------------------------------
+def start(scene, frame_paths, keyframe_path, frames, rule, interval, threshold, force_render):
+    """Starts picking the keyframes of the given frames of the scene while they are being rendered.
+    The keyframes of the previous render are picked from its written frames first."""
+    global picker
+    finish()
+    picker = KeyframePicker(scene.name, frame_paths, keyframe_path, frames, rule, interval, threshold, force_render)
+    if not bpy.app.timers.is_registered(update):
+        bpy.app.timers.register(update, first_interval=UPDATE_INTERVAL)
+
+@persistent
+def on_render_write(scene, dummy=None):
+    if picker is not None and picker.scene_name == scene.name:
+        picker.frame_written(scene.frame_current)
+
+@persistent
+def on_render_cancel(scene, dummy=None):
+    """Marks the picker of the cancelled render, so the timer stops after picking the written frames.
+    The render handlers run on the render thread, so the picker is finished by the timer."""
+    if picker is not None and picker.scene_name == scene.name:
+        picker.cancelled = True
+
+def update():
+    """Timer updating the picker, stops once all of the rendered frames were picked
+    (or the written frames of a cancelled render)."""
+    global picker
+    if picker is None:
+        return None
+    if picker.update() or picker.cancelled:
+        picker = None
+        return None
+    return UPDATE_INTERVAL
+
+def finish():
+    """Picks the keyframes from the already written frames and stops the picker."""
+    global picker
+    if picker is not None:
+        picker.update()
+        picker = None
+    if bpy.app.timers.is_registered(update):
+        bpy.app.timers.unregister(update)
@@ -1,7 +1,9 @@
 import bpy
-import os, glob
+import os
+import re
 import time
 import datetime
+from bpy.app.handlers import persistent
 from pathlib import Path
 from enum import Enum
 from abc import ABC, abstractmethod
@@ -12,11 +14,43 @@ from .state_machine import StateMachine
 from .state_machine import RenderAllOp
 
 from . import tracking_module
+from . import render_manifest
+from . import render_cache
+from . import clip_scanner
+from . import clip_probe
+from . import clip_residency
+from . import clip_prefetch
+from . import blend_backup
+from . import clip_proxy
+from . import matte_stats
+from . import keyframes
+from . import output_verify
+from . import scene_index
 
 
 #Video extensions that can be loaded in
 exts = frozenset({".mpg2", ".mov", ".avi", ".mpeg", ".movie",
         ".webm", ".mp4", ".wmv", ".mpg", ".mkv"})
+
+#Orders of the render queue (scenes with a higher pinned priority always go first)
+queue_orders = [
+    ("NAME", "Name", "Render the scenes in alphabetical order"),
+    ("SHORTEST_FIRST", "Shortest First", "Render the clips with the least frames first, for fast feedback"),
+    ("LONGEST_FIRST", "Longest First", "Render the clips with the most frames first, for better packing across workers"),
+    ("MODIFIED", "Recently Modified", "Render the clips whose source file was modified most recently first")
+    ]
+
+#Metadata of the probed clips, waiting to be saved into the clip index
+probe_results = {}
+
+#File extensions of the output profile image formats
+image_exts = {"PNG": ".png", "OPEN_EXR": ".exr"}
+
+#Output verification running in the background and whether its failed scenes are rendered again
+verification = None
+verify_requeue = False
+#Set while starting the Render All which re-renders the failed frames
+retrying_render = False
         
         
 #----------------------------------------
@@ -38,9 +72,61 @@ def updated_namespace(self, context):
         
 def updated_auto_frames(self, context):
     """Sets the number of frames to be render to match the current movie clip length."""
-    if context.scene.keying.auto_frames is True:
-        frame_count = context.window.scene.node_tree.nodes["Movie Clip"].clip.frame_duration
-        context.scene.frame_end = frame_count
+    set_auto_frames(context.window.scene)
+
+def set_auto_frames(scene):
+    """Sets the frame range of the given scene to match its movie clip length
+    (only if the scene has auto frames enabled). If the clip is not loaded,
+    the probed length from the clip list is used."""
+    if scene.keying.auto_frames is True:
+        frame_end = get_clip_frame_end(scene)
+        if frame_end is not None:
+            scene.frame_end = frame_end
+
+def get_clip_frame_end(scene):
+    """Returns the length of the movie clip of the given scene, or None if it is not known."""
+    clip = scene.node_tree.nodes["Movie Clip"].clip
+    if clip is not None:
+        return clip.frame_duration
+    clip_item = get_scene_clip_item(scene)
+    if clip_item is not None and clip_item.frame_count > 0:
+        return clip_item.frame_count
+    return None
+
+def get_scene_frame_count(scene):
+    """Returns the number of frames the given scene renders (with auto frames applied)."""
+    frame_end = scene.frame_end
+    if scene.keying.auto_frames:
+        frame_end = get_clip_frame_end(scene) or frame_end
+    return max(0, (frame_end - scene.frame_start) // scene.frame_step + 1)
+
+def get_scene_clip_mtime(scene):
+    """Returns the modification time of the source file of the given scene's clip (0 if unknown)."""
+    path = get_scene_clip_path(scene)
+    if path is None:
+        return 0
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return 0
+
+def get_queue_key(queue_order):
+    """Returns the sort key of the scenes in the render queue for the given queue order.
+    Scenes with a higher priority go first, the order is applied between scenes of the same priority."""
+    def queue_key(scene_name):
+        scene = scene_index.get_scene(scene_name)
+        if scene is None:
+            return (0, 0, scene_name)
+        if queue_order == "SHORTEST_FIRST":
+            value = get_scene_frame_count(scene)
+        elif queue_order == "LONGEST_FIRST":
+            value = -get_scene_frame_count(scene)
+        elif queue_order == "MODIFIED":
+            value = -get_scene_clip_mtime(scene)
+        else:
+            value = 0
+        return (-scene.keying.render_priority, value, scene_name)
+    return queue_key
 
 def set_default_namespace(input_path):
     """Sets default namespace based on the name of the input folder."""
@@ -48,19 +134,138 @@ def set_default_namespace(input_path):
     get_master_scene().keying_global.scene_namespace = default_namespace
         
 def load_clip_collection(context, path):
-    """Loads new clips into the clip list based on the input folder."""
+    """Updates the clip list based on the input folder (and its on-disk clip index).
+    Only the clips added or removed since the last scan are changed in the list."""
     master_scene = get_master_scene()
-    scene_namespace = master_scene.keying_global.scene_namespace
-    master_scene.clip_list.clear()
-    master_scene.keying_global.active_clip_index = -1
-    
-    for ext in exts:
-        for file_path in glob.glob(os.path.join(path, "*%s" % ext)):
-            clip_item = master_scene.clip_list.add()
-            clip_item.clip_name = os.path.basename(file_path)
-            if bpy.data.scenes.get(scene_namespace + "/" + clip_item.clip_name) is not None:
-                clip_item.icon = "HIDE_OFF"
+    global_props = master_scene.keying_global
+    clip_list = master_scene.clip_list
+    index = clip_scanner.update_index(path, exts, global_props.recursive_scan)
+    
+    active_item = get_clip_item(context, global_props.active_clip_index)
+    active_name = active_item.clip_name if active_item is not None else None
+    for i in reversed(range(len(clip_list))):
+        if clip_list[i].clip_name not in index:
+            clip_list.remove(i)
+    listed = {item.clip_name for item in clip_list}
+    for name in index:
+        if name not in listed:
+            clip_list.add().clip_name = name
+    
+    global_props.active_clip_index = -1
+    unprobed = []
+    for i, clip_item in enumerate(clip_list):
+        clip_item.path = os.path.join(path, clip_item.clip_name)
+        entry = index[clip_item.clip_name]
+        if "codec" in entry:
+            set_clip_metadata(clip_item, entry)
+        else:
+            unprobed.append(clip_item.path)
+        if clip_item.clip_name == active_name:
+            global_props.active_clip_index = i
+            clip_item.icon = "REC"
+        elif scene_index.get_clip_scene(global_props.scene_namespace, clip_item.clip_name) is not None:
+            clip_item.icon = "HIDE_OFF"
+        else:
+            clip_item.icon = "HIDE_ON"
+    
+    if global_props.auto_proxies:
+        build_clip_proxies([clip_item.path for clip_item in clip_list])
+    if unprobed:
+        clip_probe.probe_clips(unprobed)
+        if not bpy.app.timers.is_registered(apply_probe_results):
+            bpy.app.timers.register(apply_probe_results, first_interval=0.1)
+
+def set_clip_metadata(clip_item, entry):
+    """Copies the probed metadata from a clip index entry into the clip list item."""
+    clip_item.frame_count = entry["frame_count"]
+    clip_item.fps = entry["fps"]
+    clip_item.resolution = entry["resolution"]
+    clip_item.codec = entry.get("codec", "")
+
+def apply_probe_results():
+    """Timer copying the results of the background clip probes into the clip list.
+    When all of the probes finish, the results are saved into the clip index."""
+    results = clip_probe.collect_results()
+    if results:
+        probe_results.update(results)
+        for clip_item in get_master_scene().clip_list:
+            metadata = results.get(clip_item.path)
+            if metadata is not None:
+                set_clip_metadata(clip_item, metadata)
+    if clip_probe.pending:
+        return 0.2
+    
+    path = get_abs_input_path(None)
+    index = clip_scanner.load_index(path)
+    for name, entry in index.items():
+        if os.path.join(path, name) in probe_results:
+            entry.update(probe_results[os.path.join(path, name)] or {"codec": ""})
+    clip_scanner.save_index(path, index)
+    probe_results.clear()
+    return None
                 
+def build_clip_proxies(paths):
+    """Starts building the proxies of the given clips in background processes (only the missing
+    or outdated ones, checked by the workers), the loaded clips switch to them as soon as they are built."""
+    global_props = get_master_scene().keying_global
+    sizes = [size for size, enabled in ((25, global_props.proxy_25), (50, global_props.proxy_50)) if enabled]
+    if not sizes:
+        return
+    clip_proxy.build_proxies(paths, sizes, global_props.proxy_workers)
+    if clip_proxy.pending and not bpy.app.timers.is_registered(apply_proxy_results):
+        bpy.app.timers.register(apply_proxy_results, first_interval=1.0)
+
+def apply_proxy_results():
+    """Timer enabling the proxies of the loaded clips whose proxies were built."""
+    results = clip_proxy.collect_results()
+    for clip in bpy.data.movieclips:
+        sizes = results.get(bpy.path.abspath(clip.filepath))
+        if sizes is not None:
+            set_clip_proxy(clip, sizes)
+    if clip_proxy.pending:
+        return 1.0
+    return None
+
+def set_clip_proxy(clip, sizes=None):
+    """Makes the clip use its proxies if they were built from its current file (and the clip editors
+    showing it use the smallest one). Outdated proxies are disabled until they are built again.
+    The built sizes are read from the proxy folder unless given."""
+    if sizes is None:
+        sizes = clip_proxy.get_built_sizes(bpy.path.abspath(clip.filepath))
+    if sizes is None:
+        return
+    clip.use_proxy = bool(sizes)
+    if not sizes:
+        return
+    clip.proxy.timecode = "NONE"
+    for size in sizes:
+        setattr(clip.proxy, "build_%d" % size, True)
+    for window in bpy.context.window_manager.windows:
+        for area in window.screen.areas:
+            space = area.spaces.active
+            if area.type == "CLIP_EDITOR" and space.clip == clip:
+                space.clip_user.proxy_render_size = "PROXY_%d" % min(sizes)
+
+def get_scene_clip_item(scene):
+    """Returns the clip list item of the given scene (or None)."""
+    prefix = get_master_scene().keying_global.scene_namespace + "/"
+    if not scene.name.startswith(prefix):
+        return None
+    #Scenes created before the clip name was stored are named by it
+    clip_name = scene.keying.clip_name or scene.name[len(prefix):]
+    for clip_item in get_master_scene().clip_list:
+        if clip_item.clip_name == clip_name:
+            return clip_item
+    return None
+
+def get_selected_scene_name():
+    """Returns the name of the scene reserved for the clip selected in the clip list (or None)."""
+    master_scene = get_master_scene()
+    clip_item = get_clip_item(None, master_scene.clip_list_index)
+    if clip_item is None:
+        return None
+    return scene_index.get_clip_scene_name(master_scene.keying_global.scene_namespace, clip_item.clip_name)
+
 def get_clip_item(context, index):
     """Returns an item from the clip list at the given index."""
     if index < 0: #Checking if index is not negative (negative index does not throw exception)
@@ -75,25 +280,29 @@ def get_clip_item(context, index):
     
 def switch_clip(context, clip_index):
     """Switches the scene to a scene reserved for the given clip index.
-    If the scene was not yet created, it gets created by making a full
-    copy of the current scene."""
+    If the scene was not yet created, it gets created by making a copy
+    of the current scene."""
     clip_item = get_clip_item(context, clip_index)
     if clip_item:
-        scene_name = get_master_scene().keying_global.scene_namespace + "/" + clip_item.clip_name
-        scn = bpy.data.scenes.get(scene_name)
+        scene_name = scene_index.get_clip_scene_name(get_master_scene().keying_global.scene_namespace, clip_item.clip_name)
+        scn = scene_index.get_scene(scene_name)
         if scn is None:
             new_scene(context, scene_name)
-            load_clip(context, clip_item.clip_name)
+            clip = load_clip(context, clip_item.clip_name)
+            bpy.context.window.scene.keying.clip_path = clip_item.path
+            bpy.context.window.scene.keying.clip_name = clip_item.clip_name
+            bpy.context.window.scene.node_tree.nodes["Movie Clip"].clip = clip
+            bpy.context.window.scene.node_tree.nodes["Stabilize 2D"].clip = clip
         else:
             switch_scene(context, scene_name)
+        #Loads the clip again if it was unloaded since the scene was last used
+        clip = load_scene_clip(bpy.context.window.scene)
+        if clip is not None:
+            set_clip_proxy(clip)
         clip_item.icon = "REC"
     else:
         return
     
-    clip = bpy.data.movieclips.get(clip_item.clip_name)
-    bpy.context.window.scene.node_tree.nodes["Movie Clip"].clip = clip
-    bpy.context.window.scene.node_tree.nodes["Stabilize 2D"].clip = clip
-    
     prev_index = get_master_scene().keying_global.active_clip_index
     prev_item = get_clip_item(context, prev_index)
     if prev_item is not None and prev_index is not clip_index:
@@ -103,44 +312,597 @@ def switch_clip(context, clip_index):
 
 def switch_to_mask(context):
     """Reconnects the nodes into a mask view (Matte socket of the Keying node)."""
-    node_tree = context.window.scene.node_tree
-    crop_node = node_tree.nodes["Crop"]
-    balance_node = node_tree.nodes["Keying"]
-    context.window.scene.node_tree.links.new(balance_node.outputs[1],crop_node.inputs[0])
-    context.scene.render.image_settings.color_mode = "BW"
-    context.scene.keying.showing_mask = True
+    set_scene_view(context.window.scene, True)
 
 def switch_to_video(context):
     """Reconnects the nodes into a video view."""
-    node_tree = context.window.scene.node_tree
+    set_scene_view(context.window.scene, False)
+
+def set_scene_view(scene, show_mask):
+    """Reconnects the nodes of the given scene into a mask view (Matte socket
+    of the Keying node) or a video view (Image socket of the Keying node)."""
+    node_tree = scene.node_tree
     crop_node = node_tree.nodes["Crop"]
     keying_node = node_tree.nodes["Keying"]
-    context.window.scene.node_tree.links.new(keying_node.outputs[0],crop_node.inputs[0])
-    context.scene.render.image_settings.color_mode = "RGBA"
-    context.scene.keying.showing_mask = False
+    if show_mask:
+        node_tree.links.new(keying_node.outputs[1],crop_node.inputs[0])
+        scene.render.image_settings.color_mode = "BW"
+    else:
+        node_tree.links.new(keying_node.outputs[0],crop_node.inputs[0])
+        scene.render.image_settings.color_mode = "RGBA"
+    scene.keying.showing_mask = show_mask
+    apply_output_profile(scene, show_mask)
 
-def load_clip(context, clip_name):
-    """Loads a given clip into the Blenders clip storage."""
-    path = os.path.join(get_abs_input_path(context), clip_name)
-    old_clip = bpy.data.movieclips.get(clip_name)
-    if old_clip != None:
-        if old_clip.filepath != path:
-            bpy.data.movieclips.remove(old_clip)
-            bpy.data.movieclips.load(path)
+def get_output_profile(namespace):
+    """Returns the output profile of the given namespace, or None if its scenes keep their own output format."""
+    return get_master_scene().keying_global.output_profiles.get(namespace)
+
+def get_scene_output_profile(scene):
+    """Returns the output profile of the namespace of the given scene (None if it has none)."""
+    #Clip names can contain slashes (clips in subfolders), so the namespace is matched as a prefix
+    for profile in get_master_scene().keying_global.output_profiles:
+        if scene.name.startswith(profile.name + "/"):
+            return profile
+    return None
+
+def set_image_format(settings, file_format, color_depth, profile):
+    """Sets the image format settings (of the scene or of a File Output node) to the image format of the profile."""
+    settings.file_format = file_format
+    if file_format == "PNG":
+        settings.color_depth = color_depth
+        settings.compression = profile.png_compression
+    else:
+        settings.color_depth = "16" if profile.exr_half else "32"
+        settings.exr_codec = profile.exr_codec
+
+def apply_output_profile(scene, show_mask):
+    """Sets the output format of the given scene view (video or mask) from the output profile
+    of its namespace. Masks are single channel images, the video is either an image sequence
+    or a single movie file."""
+    profile = get_scene_output_profile(scene)
+    if profile is None:
+        return
+    settings = scene.render.image_settings
+    if show_mask:
+        set_image_format(settings, profile.mask_format, profile.mask_depth, profile)
+        settings.color_mode = "BW"
+    elif profile.video_format == "FFMPEG":
+        settings.file_format = "FFMPEG"
+        ffmpeg = scene.render.ffmpeg
+        if profile.movie_codec == "H264":
+            ffmpeg.format, ffmpeg.codec = "MPEG4", "H264"
+            ffmpeg.constant_rate_factor = profile.movie_quality
+            settings.color_mode = "RGB"
+        else:
+            ffmpeg.format, ffmpeg.codec = "MKV", "FFV1"
+            settings.color_mode = "RGBA"
+        ffmpeg.audio_codec = "NONE"
+    else:
+        set_image_format(settings, profile.video_format, profile.video_depth, profile)
+        settings.color_mode = "RGBA"
+
+def get_output_settings(profile, show_mask):
+    """Returns the settings of the profile which affect the output of the given view (None without a profile)."""
+    if profile is None:
+        return None
+    image_settings = (profile.png_compression, profile.exr_codec, profile.exr_half)
+    if show_mask:
+        return (profile.mask_format, profile.mask_depth) + image_settings
+    if profile.video_format == "FFMPEG":
+        return (profile.video_format, profile.movie_codec, profile.movie_quality)
+    return (profile.video_format, profile.video_depth) + image_settings
+
+def get_scene_render_key(scene, show_mask):
+    """Returns the render key of the given scene view, using its output profile if it has one."""
+    output_settings = get_output_settings(get_scene_output_profile(scene), show_mask)
+    return render_cache.get_render_key(scene, show_mask, output_settings)
+
+def get_output_chain(node_tree, node):
+    """Returns the links along which the image of the given node reaches the Composite node,
+    or None if it does not reach it."""
+    node_links = {}
+    for link in node_tree.links:
+        node_links.setdefault(link.from_node.name, []).append(link)
+    visited = {node.name}
+    def find_chain(node):
+        for link in node_links.get(node.name, ()):
+            if link.to_node.bl_idname == "CompositorNodeComposite":
+                return [link]
+            if link.to_node.name in visited:
+                continue
+            visited.add(link.to_node.name)
+            chain = find_chain(link.to_node)
+            if chain is not None:
+                return [link] + chain
+        return None
+    return find_chain(node)
+
+def get_socket_index(sockets, socket):
+    for index, node_socket in enumerate(sockets):
+        if node_socket == socket:
+            return index
+    return 0
+
+def copy_node(node_tree, node):
+    """Returns the copy of the given node in the single pass mask branch (creating it if it does not exist)
+    with the same settings, input values and input links as the node."""
+    name = render_cache.MASK_NODE_PREFIX + node.name
+    mask_node = node_tree.nodes.get(name)
+    if mask_node is not None and mask_node.bl_idname != node.bl_idname:
+        node_tree.nodes.remove(mask_node)
+        mask_node = None
+    if mask_node is None:
+        mask_node = node_tree.nodes.new(node.bl_idname)
+        mask_node.name = name
+        mask_node.location = (node.location.x, node.location.y - 250)
+
+    base_properties = bpy.types.Node.bl_rna.properties
+    for prop in node.bl_rna.properties:
+        if prop.is_readonly or prop.identifier in base_properties:
+            continue
+        setattr(mask_node, prop.identifier, getattr(node, prop.identifier))
+    for index, socket in enumerate(node.inputs):
+        if socket.is_linked:
+            for link in list(node_tree.links):
+                if link.to_socket == socket:
+                    node_tree.links.new(link.from_socket, mask_node.inputs[index])
+        elif hasattr(socket, "default_value"):
+            mask_node.inputs[index].default_value = socket.default_value
+    return mask_node
+
+def set_mask_output(scene, mask_path):
+    """Sets up a File Output branch which writes the matte of the given scene into mask_path
+    during the video render. The matte passes through copies of the Crop node and of all nodes
+    between it and the Composite node (Keying Matte -> Mask Crop -> ... -> Mask Output),
+    so the mask gets the same crop and transformations as the video. Passing None mutes the branch."""
+    node_tree = scene.node_tree
+    output_node = node_tree.nodes.get(render_cache.MASK_OUTPUT_NAME)
+    if mask_path is None:
+        if output_node is not None:
+            output_node.mute = True
+        return
+
+    crop_node = node_tree.nodes["Crop"]
+    keying_node = node_tree.nodes["Keying"]
+    chain = get_output_chain(node_tree, crop_node) or []
+    #The socket of each node of the chain the image enters and leaves by
+    chain_nodes = [(crop_node, 0)]
+    for link in chain[:-1]:
+        chain_nodes.append((link.to_node, get_socket_index(link.to_node.inputs, link.to_socket)))
+    from_socket = keying_node.outputs[1]
+    for position, (node, input_index) in enumerate(chain_nodes):
+        mask_node = copy_node(node_tree, node)
+        node_tree.links.new(from_socket, mask_node.inputs[input_index])
+        output_index = get_socket_index(node.outputs, chain[position].from_socket) if chain else 0
+        from_socket = mask_node.outputs[output_index]
+
+    if output_node is None:
+        output_node = node_tree.nodes.new("CompositorNodeOutputFile")
+        output_node.name = render_cache.MASK_OUTPUT_NAME
+    last_node = chain_nodes[-1][0]
+    output_node.location = (last_node.location.x + 200, last_node.location.y - 250)
+    node_tree.links.new(from_socket, output_node.inputs[0])
+
+    output_node.base_path = mask_path + os.path.sep
+    output_node.file_slots[0].path = "####"
+    profile = get_scene_output_profile(scene)
+    if profile is not None:
+        set_image_format(output_node.format, profile.mask_format, profile.mask_depth, profile)
+    else:
+        output_node.format.file_format = scene.render.image_settings.file_format
+    output_node.format.color_mode = "BW"
+    output_node.mute = False
+
+def is_mask_output_enabled(scene):
+    """Returns whether the mask of the given scene is being written during its video render."""
+    output_node = scene.node_tree.nodes.get(render_cache.MASK_OUTPUT_NAME)
+    return output_node is not None and not output_node.mute
+
+def update_mask_output(scene, force_render, missing_frames, save_manifest=True):
+    """Enables the single pass mask output for the video render of the given scene
+    if its mask is to be rendered and all of its missing frames get rendered
+    with the video (missing_frames), otherwise disables it. Without save_manifest,
+    the manifest of the mask folder is left unchanged."""
+    mask_path = os.path.join(get_scene_output_path(scene), "mask")
+    if (scene.keying.render_mask and not scene.keying.showing_mask
+            and get_master_scene().keying_global.single_pass_mask):
+        create_directory(mask_path)
+        mask_key = get_scene_render_key(scene, True)
+        if force_render:
+            if save_manifest:
+                render_manifest.save_manifest(mask_path, {"frames": {}, "key": mask_key})
+            set_mask_output(scene, mask_path)
+            return
+        missing_masks = render_manifest.validate_frames(scene, mask_path, mask_key, save_manifest)
+        if missing_masks and set(missing_masks) <= set(missing_frames):
+            set_mask_output(scene, mask_path)
+            return
+    set_mask_output(scene, None)
+
+def prepare_render(scene, force_render, frame_range=None):
+    """Prepares the output folders and the render settings for rendering the current view
+    (video or mask) of the given scene. Already rendered valid frames are kept and skipped
+    by the render, unless force_render is set or the render key of the scene (source clip,
+    compositor and render settings) has changed. If a (first, last) frame_range is given,
+    only that chunk of the scene's frames is prepared (and set as the scene's frame range).
+    The chunks are rendered by parallel farm workers after the coordinator prepared the whole scene,
+    so their manifests are not written again for a chunk.
+    Returns the list of frames to render (empty if there is nothing to render)."""
+    load_scene_clip(scene)
+    save_path = get_scene_output_path(scene)
+    render_subfolder = get_scene_render_subfolder(scene)
+    create_directory(save_path)
+    if not scene.keying.showing_mask:
+        create_directory(os.path.join(save_path,"keyframes"))
+    create_directory(render_subfolder)
+
+    set_auto_frames(scene)
+    if frame_range is not None:
+        scene.frame_start, scene.frame_end = frame_range
+    scene.render.filepath = render_subfolder + os.path.sep
+    apply_output_profile(scene, scene.keying.showing_mask)
+    key = get_scene_render_key(scene, scene.keying.showing_mask)
+    if scene.render.is_movie_format:
+        #A movie file can only be rendered whole
+        missing_frames = render_manifest.validate_movie(scene, render_subfolder, key, force_render)
+    elif force_render:
+        missing_frames = list(range(scene.frame_start, scene.frame_end + 1, scene.frame_step))
+        if frame_range is None:
+            render_manifest.save_manifest(render_subfolder, {"frames": {}, "key": key})
+    else:
+        missing_frames = render_manifest.validate_frames(scene, render_subfolder, key, frame_range is None)
+    if not missing_frames:
+        set_mask_output(scene, None)
+        return missing_frames
+    scene.render.use_overwrite = force_render
+    update_mask_output(scene, force_render, missing_frames, frame_range is None)
+    return missing_frames
+
+@persistent
+def record_movie_render(scene, dummy=None):
+    """Records the finished movie renders of the scenes with an output profile, so they are not rendered again."""
+    if scene.render.is_movie_format and get_scene_output_profile(scene) is not None:
+        render_manifest.record_movie(scene, get_scene_render_subfolder(scene))
+
+def update_scene_mask_stats(scene, background=True):
+    """Updates the mask statistics sidecar (bounding boxes, coverage, suggested crop) of the given
+    scene from its rendered mask frames, if the statistics are enabled and the scene renders a mask.
+    In the background the frames are read on timer ticks, otherwise at once (e.g. in the render farm)."""
+    global_props = get_master_scene().keying_global
+    if not global_props.mask_stats or not scene.keying.render_mask:
+        return
+    crop_node = scene.node_tree.nodes.get("Crop")
+    #Crop node settings are only suggested if no node transforms the image between Crop and Composite
+    if crop_node is not None and len(get_output_chain(scene.node_tree, crop_node) or ()) != 1:
+        crop_node = None
+    update = matte_stats.start if background else matte_stats.update_mask_stats
+    #The mask frames are named by the mask output format, which can differ from the current view of the scene
+    update(get_view_frame_paths(scene, True), get_scene_output_path(scene),
+        global_props.mask_threshold, global_props.mask_crop_padding, matte_stats.get_crop_offset(crop_node))
+
+def start_keyframe_picker(scene, frames, force_render):
+    """Starts picking the keyframes of the scene from its video frames as they get rendered."""
+    global_props = get_master_scene().keying_global
+    if scene.keying.showing_mask or scene.render.is_movie_format or global_props.keyframe_rule == "NONE":
+        return
+    frame_paths = render_manifest.get_frame_paths(scene, get_scene_render_subfolder(scene))
+    keyframes.start(scene, frame_paths, os.path.join(get_scene_output_path(scene), "keyframes"), frames,
+        global_props.keyframe_rule, global_props.keyframe_interval, global_props.keyframe_threshold, force_render)
+
+def get_view_frame_paths(scene, show_mask):
+    """Returns the paths of all frames of the given view (video or mask) of the scene
+    in the file format the view is rendered in."""
+    folder = os.path.join(get_scene_output_path(scene), "mask" if show_mask else "video")
+    frame_paths = render_manifest.get_frame_paths(scene, folder)
+    profile = get_scene_output_profile(scene)
+    if profile is not None:
+        ext = image_exts[profile.mask_format if show_mask else profile.video_format]
+        #Not derived from the scene's current output, which can be a movie (one file name for all frames)
+        frame_paths = {frame: os.path.join(folder, "%04d%s" % (frame, ext)) for frame in frame_paths}
+    return frame_paths
+
+def add_verify_passes(verification, scene):
+    """Adds the video (and mask) pass of the given scene into the output verification."""
+    save_path = get_scene_output_path(scene)
+    profile = get_scene_output_profile(scene)
+    if profile is not None and profile.video_format == "FFMPEG":
+        verification.add(scene.name, save_path, "video", movie_folder=os.path.join(save_path, "video"))
     else:
-        bpy.data.movieclips.load(path)
-    movie_clip = bpy.data.movieclips.get(clip_name)
+        verification.add(scene.name, save_path, "video", get_view_frame_paths(scene, False))
+    if scene.keying.render_mask:
+        verification.add(scene.name, save_path, "mask", get_view_frame_paths(scene, True))
+
+def verify_scenes(scene_names, decode):
+    """Verifies the output of the given scenes and waits for the result. The broken frames are deleted,
+    so they get rendered again. Returns the names of the scenes which failed the verification."""
+    scene_verification = output_verify.Verification(decode, remove_failed=True)
+    try:
+        for scene_name in scene_names:
+            scene = scene_index.get_scene(scene_name)
+            if scene is not None:
+                add_verify_passes(scene_verification, scene)
+        return scene_verification.wait()
+    finally:
+        scene_verification.shutdown()
+
+def start_verification(requeue):
+    """Starts verifying the output of all scenes in the namespace in the background. The broken frames
+    are deleted and, if requeue is set, the failed scenes are rendered again once all scenes are verified.
+    Returns the number of verified scenes."""
+    global verification, verify_requeue
+    global_props = get_master_scene().keying_global
+    if verification is not None:
+        verification.shutdown()
+    verification = output_verify.Verification(global_props.verify_decode, remove_failed=True)
+    verify_requeue = requeue
+    scene_names = state_machine.filter_scenes(global_props.scene_namespace)
+    for scene_name in scene_names:
+        scene = scene_index.get_scene(scene_name)
+        if scene is not None:
+            add_verify_passes(verification, scene)
+    if not bpy.app.timers.is_registered(apply_verify_results):
+        bpy.app.timers.register(apply_verify_results, first_interval=0.5)
+    return len(scene_names)
+
+def stop_verification():
+    """Stops the running output verification without applying its results."""
+    global verification
+    if verification is not None:
+        verification.shutdown()
+        verification = None
+
+def apply_verify_results():
+    """Timer waiting for the output verification, requeues the failed scenes when it finishes."""
+    global verification
+    if verification is None:
+        return None
+    verification.collect_results()
+    if verification.pending:
+        return 0.5
+    failed = verification.get_failed_scenes()
+    print("KEYING VERIFY: %d of %d clips passed" % (len(verification.results) - len(failed), len(verification.results)))
+    verification.shutdown()
+    verification = None
+    if failed:
+        print("KEYING VERIFY: failed %s" % ", ".join(failed))
+        requeue_scenes(failed)
+    return None
+
+def requeue_scenes(scene_names):
+    """Starts a Render All rendering the missing frames of the scenes (the verification never runs
+    during a Render All, a Render All started meanwhile stops it)."""
+    global retrying_render
+    if not verify_requeue or state_machine.active_state_machine is not None:
+        return
+    window = bpy.context.window_manager.windows[0]
+    retrying_render = True
+    try:
+        #Scenes which were rendered without errors are skipped by the render
+        bpy.ops.keying.keying_render_all({"window": window, "screen": window.screen, "scene": window.scene})
+    finally:
+        retrying_render = False
+
+def get_preview_frames(scene, step, frame_list):
+    """Returns the frames of the scene rendered by the preview, either the frames and frame ranges
+    listed in frame_list (e.g. "1, 50, 100-120"), or every step-th frame of the scene's frame range.
+    Raises ValueError if the list cannot be parsed."""
+    if not frame_list.strip():
+        return list(range(scene.frame_start, scene.frame_end + 1, step))
+    frames = set()
+    for part in frame_list.split(","):
+        first, _, last = part.strip().partition("-")
+        frames.update(range(int(first), int(last or first) + 1))
+    return sorted(frame for frame in frames if scene.frame_start <= frame <= scene.frame_end)
+
+def clear_preview(preview_path, prefix):
+    """Deletes the frames of the previous preview with the given file name prefix."""
+    pattern = re.compile(re.escape(prefix) + r"\d+\.\w+$")
+    for file_name in os.listdir(preview_path):
+        if pattern.match(file_name):
+            os.remove(os.path.join(preview_path, file_name))
+
+def render_preview(scene):
+    """Renders a sparse sample of frames of the current view (video or mask) of the given scene
+    at a reduced resolution into the preview folder of the clip, without touching its video
+    and mask renders. The render settings of the scene are restored afterwards.
+    Returns the number of rendered frames."""
+    global_props = get_master_scene().keying_global
+    load_scene_clip(scene)
+    set_auto_frames(scene)
+    frames = get_preview_frames(scene, global_props.preview_step, global_props.preview_frames)
+    save_path = get_scene_output_path(scene)
+    preview_path = os.path.join(save_path, "preview")
+    create_directory(save_path)
+    create_directory(preview_path)
+    prefix = "mask_" if scene.keying.showing_mask else ""
+    clear_preview(preview_path, prefix)
+
+    render = scene.render
+    settings = (render.filepath, render.resolution_percentage, render.use_overwrite, render.image_settings.file_format)
+    frame_current = scene.frame_current
+    mask_output_enabled = is_mask_output_enabled(scene)
+    try:
+        set_mask_output(scene, None)
+        render.filepath = os.path.join(preview_path, prefix)
+        render.resolution_percentage = global_props.preview_resolution
+        render.use_overwrite = True
+        if render.is_movie_format:
+            #The preview frames are written as images
+            render.image_settings.file_format = "PNG"
+        for frame in frames:
+            scene.frame_set(frame)
+            bpy.ops.render.render(write_still=True, scene=scene.name)
+    finally:
+        render.filepath, render.resolution_percentage, render.use_overwrite, render.image_settings.file_format = settings
+        scene.frame_set(frame_current)
+        if mask_output_enabled:
+            scene.node_tree.nodes[render_cache.MASK_OUTPUT_NAME].mute = False
+    return len(frames)
+
+def load_clip(context, clip_name):
+    """Loads a given clip (path relative to the input folder) into the Blenders clip storage
+    and returns it."""
+    return clip_residency.load_clip_file(os.path.join(get_abs_input_path(context), clip_name),
+        clip_residency.get_clip_name(clip_name))
+
+def get_scene_clip_path(scene):
+    """Returns the absolute path of the movie clip of the given scene (None if it has no clip)."""
+    clip = scene.node_tree.nodes["Movie Clip"].clip
+    path = clip.filepath if clip is not None else scene.keying.clip_path
+    return bpy.path.abspath(path) if path else None
+
+def prefetch_scene_clip(scene_name):
+    """Starts reading the movie clip of the given scene in the background, so that it is
+    already in the OS file cache when the scene gets rendered."""
+    prefetch_size = get_master_scene().keying_global.prefetch_size
+    scene = scene_index.get_scene(scene_name) if scene_name is not None else None
+    if prefetch_size <= 0 or scene is None:
+        return
+    path = get_scene_clip_path(scene)
+    if path is not None:
+        clip_prefetch.prefetch(path, prefetch_size * 2**20)
+
+def load_scene_clip(scene):
+    """Returns the movie clip of the given scene, loading it again if it was unloaded.
+    Only the most recently used clips are kept loaded, the rest gets unloaded."""
+    return clip_residency.get_scene_clip(scene, get_master_scene().keying_global.max_loaded_clips)
 
 def new_scene(context, scene_name):
-    """Creates a new scene by making a full copy of the current scene."""
-    scn = bpy.data.scenes.get(scene_name)
+    """Creates a new scene by making a copy of the current scene. Depending on the scene copy mode,
+    either everything is duplicated (full copy), or only the scene with its compositor and
+    per-clip settings, while the collections, objects and world stay shared (linked copy)."""
+    scn = scene_index.get_scene(scene_name)
     if scn is None:
-        bpy.ops.scene.new(type="FULL_COPY")
+        bpy.ops.scene.new(type=get_master_scene().keying_global.scene_copy_mode)
         context.window.scene.name = scene_name
+        #The renamed copy is not found in the index under its new name
+        scene_index.invalidate()
+
+def copy_scene(context, template, scene_name, copy_mode):
+    """Creates a copy of the template scene with the given name (see new_scene for the copy modes).
+    Linked copies are made directly without an operator call, full copies make the new scene
+    the active scene of the window."""
+    if copy_mode == "LINK_COPY":
+        scene = template.copy()
+    else:
+        bpy.ops.scene.new({"window": context.window, "scene": template}, type=copy_mode)
+        scene = context.window.scene
+    scene.name = scene_name
+    return scene
+
+def set_scene_clip_path(scene, path, clip_name):
+    """Sets the clip of the given scene by its path (and path relative to the input folder) only,
+    the clip is loaded when the scene is used."""
+    scene.keying.clip_path = path
+    scene.keying.clip_name = clip_name
+    #The settings of the copied scene's clip do not belong to this clip
+    scene.keying.clip_settings = ""
+    scene.node_tree.nodes["Movie Clip"].clip = None
+    scene.node_tree.nodes["Stabilize 2D"].clip = None
+
+def create_namespace_scenes(context, template):
+    """Creates the scenes of all clips in the clip list which do not have one yet, as copies of
+    the template scene. The clips are not loaded, only their paths are set.
+    Returns the number of created scenes."""
+    master_scene = get_master_scene()
+    global_props = master_scene.keying_global
+    namespace = global_props.scene_namespace
+    active_scene = context.window.scene
+    created = 0
+    for clip_item in master_scene.clip_list:
+        if scene_index.get_clip_scene(namespace, clip_item.clip_name) is not None:
+            continue
+        scene_name = scene_index.get_clip_scene_name(namespace, clip_item.clip_name)
+        scene = copy_scene(context, template, scene_name, global_props.scene_copy_mode)
+        set_scene_clip_path(scene, clip_item.path, clip_item.clip_name)
+        if clip_item.icon == "HIDE_ON":
+            clip_item.icon = "HIDE_OFF"
+        created += 1
+    context.window.scene = active_scene
+    scene_index.invalidate()
+    return created
+
+def clone_namespace(context, namespace, new_namespace, input_path):
+    """Copies all scenes of the namespace (with their settings) into the new namespace, using the clips
+    of the same names from the given input folder. Scenes already in the new namespace are kept.
+    The output profile of the namespace is copied too. Returns the number of cloned scenes."""
+    global_props = get_master_scene().keying_global
+    existing = set(state_machine.filter_scenes(new_namespace))
+    active_scene = context.window.scene
+    cloned = 0
+    for scene_name in state_machine.filter_scenes(namespace):
+        scene = scene_index.get_scene(scene_name)
+        if scene is None:
+            continue
+        clip_name = scene.keying.clip_name or scene_name[len(namespace) + 1:]
+        new_name = scene_index.get_clip_scene_name(new_namespace, clip_name)
+        if new_name in existing:
+            continue
+        clone = copy_scene(context, scene, new_name, global_props.scene_copy_mode)
+        set_scene_clip_path(clone, os.path.join(input_path, clip_name), clip_name)
+        cloned += 1
+    context.window.scene = active_scene
+    scene_index.invalidate()
+
+    profile = get_output_profile(namespace)
+    if profile is not None and get_output_profile(new_namespace) is None:
+        new_profile = global_props.output_profiles.add()
+        for prop in profile.bl_rna.properties:
+            if prop.identifier not in {"rna_type", "name"}:
+                setattr(new_profile, prop.identifier, getattr(profile, prop.identifier))
+        new_profile.name = new_namespace
+    return cloned
+
+def get_scene_datablocks(scene):
+    """Returns the datablocks used by the given scene which can be left without users when it is removed
+    (its movie clips, world, collections, objects and their data)."""
+    datablocks = set()
+    if scene.node_tree is not None:
+        for node in scene.node_tree.nodes:
+            if getattr(node, "clip", None) is not None:
+                datablocks.add(node.clip)
+    if scene.world is not None:
+        datablocks.add(scene.world)
+    collections = [scene.collection]
+    while collections:
+        collection = collections.pop()
+        if collection != scene.collection:
+            datablocks.add(collection)
+        collections.extend(collection.children)
+        for obj in collection.objects:
+            datablocks.add(obj)
+            if obj.data is not None:
+                datablocks.add(obj.data)
+    return datablocks
+
+def delete_namespace_scenes(context, namespace):
+    """Removes all scenes of the namespace at once, together with the datablocks which only they used.
+    Returns (number of removed scenes, number of removed orphaned datablocks)."""
+    scenes = [scene_index.get_scene(scene_name) for scene_name in state_machine.filter_scenes(namespace)]
+    scenes = [scene for scene in scenes if scene is not None]
+    if context.window.scene in scenes:
+        context.window.scene = get_master_scene()
+    candidates = set()
+    for scene in scenes:
+        candidates.update(get_scene_datablocks(scene))
+    bpy.data.batch_remove(scenes)
+    scene_index.invalidate()
+    clip_residency.clear()
+
+    #Removing objects leaves their data without users, so the orphans are removed until none are left
+    orphan_count = 0
+    while True:
+        orphans = [datablock for datablock in candidates if datablock.users == 0]
+        if not orphans:
+            break
+        candidates.difference_update(orphans)
+        bpy.data.batch_remove(orphans)
+        orphan_count += len(orphans)
+    return len(scenes), orphan_count
 
 def switch_scene(context, scene_name):
     """Switches the editor to the defined scene."""
-    scn = bpy.data.scenes.get(scene_name)
+    scn = scene_index.get_scene(scene_name)
     if scn is not None:
         context.window.scene = scn
 
@@ -150,35 +912,49 @@ def create_directory(path):
         
 def get_output_clip_path(context):
     """Returns the current user defined output path."""
-    clipName = get_curr_clip_name(context)
-    return os.path.join(get_abs_output_path(context), clipName)
+    return get_scene_output_path(context.window.scene)
+
+def get_scene_output_path(scene):
+    """Returns the output folder of the clip used by the given scene."""
+    return os.path.join(get_abs_output_path(None), get_scene_clip_name(scene))
 
 def get_curr_clip_name(context):
     """Returns the name of the currently active clip."""
-    movie_clip = context.window.scene.node_tree.nodes["Movie Clip"].clip
-    if movie_clip is None:
-        return None
-    return os.path.splitext(movie_clip.name)[0]
+    return get_scene_clip_name(context.window.scene)
+
+def get_scene_clip_name(scene):
+    """Returns the name of the clip used by the given scene (the output folder of the scene)."""
+    if scene.keying.clip_name:
+        return os.path.splitext(clip_residency.get_clip_name(scene.keying.clip_name))[0]
+    movie_clip = scene.node_tree.nodes["Movie Clip"].clip
+    if movie_clip is not None:
+        return os.path.splitext(movie_clip.name)[0]
+    #The clip was unloaded
+    if scene.keying.clip_path:
+        return os.path.splitext(os.path.basename(scene.keying.clip_path))[0]
+    return None
     
 def get_master_scene():
     """Returns the master scene (used for storing global properties).
     If none exists, then it is created."""
-    master_scene = bpy.data.scenes.get("MasterScene")
+    master_scene = scene_index.get_master_scene()
     if master_scene is None:
-        master_scene = bpy.data.scenes.new("MasterScene")
+        master_scene = bpy.data.scenes.new(scene_index.MASTER_SCENE_NAME)
     return master_scene
     
 def backup_blend_file(path):
-    """Saves the blend file into the given path."""
-    curr_filepath = bpy.data.filepath
-    curr_time = datetime.datetime.now()
-    backup_filename = curr_time.strftime("keying_backup_%Y-%m-%d_%H-%M-%S.blend")
-    bpy.ops.wm.save_as_mainfile(filepath = os.path.join(path, backup_filename))
-    bpy.ops.wm.save_mainfile(filepath = curr_filepath)
+    """Saves a copy of the blend file into the given path in the background
+    (compressed and limited to the last backups as set by the global settings)."""
+    global_props = get_master_scene().keying_global
+    blend_backup.backup_blend_file(path, global_props.backup_compress, global_props.backup_count)
     
 def get_render_subfolder(context):
-    save_path = get_output_clip_path(context)
-    if context.scene.keying.showing_mask:
+    return get_scene_render_subfolder(context.window.scene)
+
+def get_scene_render_subfolder(scene):
+    """Returns the folder the current view (video or mask) of the given scene renders into."""
+    save_path = get_scene_output_path(scene)
+    if scene.keying.showing_mask:
         return os.path.join(save_path,"mask")
     else:
         return os.path.join(save_path, "video")
@@ -201,6 +977,111 @@ class KeyingClipCollection(bpy.types.PropertyGroup):
     clip_name: bpy.props.StringProperty()
     path: bpy.props.StringProperty()
     icon: bpy.props.StringProperty(default="HIDE_ON")
+    frame_count: bpy.props.IntProperty()
+    fps: bpy.props.FloatProperty()
+    resolution: bpy.props.IntVectorProperty(size=2)
+    codec: bpy.props.StringProperty()
+
+class KeyingOutputProfile(bpy.types.PropertyGroup):
+    """Used for storing the output format of the renders of a namespace (the name of the profile)."""
+    video_format: bpy.props.EnumProperty \
+      (
+      name = "Video Format",
+      description = "Format of the video renders",
+      items = [
+        ("PNG", "PNG", "Sequence of PNG images"),
+        ("OPEN_EXR", "OpenEXR", "Sequence of OpenEXR images"),
+        ("FFMPEG", "Movie", "A single movie file encoded by FFmpeg (rendered whole, not in chunks)")
+        ],
+      default = "PNG"
+      )
+      
+    video_depth: bpy.props.EnumProperty \
+      (
+      name = "Color Depth",
+      description = "Bit depth of the video PNG images",
+      items = [
+        ("8", "8 bit", "8 bits per channel"),
+        ("16", "16 bit", "16 bits per channel")
+        ],
+      default = "8"
+      )
+      
+    png_compression: bpy.props.IntProperty \
+      (
+      name = "Compression",
+      description = "PNG compression in percent, lower values write larger files faster",
+      default = 15,
+      min = 0,
+      max = 100,
+      subtype = "PERCENTAGE"
+      )
+      
+    exr_codec: bpy.props.EnumProperty \
+      (
+      name = "EXR Codec",
+      description = "Compression of the OpenEXR images",
+      items = [
+        ("DWAA", "DWAA", "Lossy, small files"),
+        ("ZIP", "ZIP", "Lossless"),
+        ("PIZ", "PIZ", "Lossless, good for noisy images"),
+        ("NONE", "None", "No compression")
+        ],
+      default = "DWAA"
+      )
+      
+    exr_half: bpy.props.BoolProperty \
+      (
+      name = "Half Float",
+      description = "Write 16 bit half float OpenEXR images instead of 32 bit",
+      default = True
+      )
+      
+    movie_codec: bpy.props.EnumProperty \
+      (
+      name = "Codec",
+      description = "Codec of the movie file",
+      items = [
+        ("H264", "H.264", "Small MPEG-4 files without transparency"),
+        ("FFV1", "FFV1", "Lossless Matroska files with transparency")
+        ],
+      default = "H264"
+      )
+      
+    movie_quality: bpy.props.EnumProperty \
+      (
+      name = "Quality",
+      description = "Constant quality of the H.264 movie",
+      items = [
+        ("PERC_LOSSLESS", "Perceptually Lossless", ""),
+        ("HIGH", "High", ""),
+        ("MEDIUM", "Medium", ""),
+        ("LOW", "Low", "")
+        ],
+      default = "HIGH"
+      )
+      
+    mask_format: bpy.props.EnumProperty \
+      (
+      name = "Mask Format",
+      description = "Format of the (single channel) mask images",
+      items = [
+        ("PNG", "PNG", "Sequence of PNG images"),
+        ("OPEN_EXR", "OpenEXR", "Sequence of OpenEXR images")
+        ],
+      default = "PNG"
+      )
+      
+    mask_depth: bpy.props.EnumProperty \
+      (
+      name = "Mask Depth",
+      description = "Bit depth of the mask PNG images",
+      items = [
+        ("8", "8 bit", "8 bits per channel"),
+        ("16", "16 bit", "16 bits per channel")
+        ],
+      default = "8"
+      )
 
 class KeyingGlobalProps(bpy.types.PropertyGroup):
     """Used for storing all of the global user defined properties."""
@@ -221,6 +1102,43 @@ class KeyingGlobalProps(bpy.types.PropertyGroup):
       update = updated_input_path
       )
       
+    recursive_scan: bpy.props.BoolProperty \
+      (
+      name = "Include Subfolders",
+      default = False,
+      description = "Load the clips from the subfolders of the input folder as well",
+      update = updated_namespace
+      )
+      
+    auto_proxies: bpy.props.BoolProperty \
+      (
+      name = "Build Proxies Automatically",
+      default = False,
+      description = "Build the missing proxies of the clips whenever the clip list is loaded"
+      )
+      
+    proxy_25: bpy.props.BoolProperty \
+      (
+      name = "25%",
+      default = True,
+      description = "Build proxies at 25% of the clip resolution"
+      )
+      
+    proxy_50: bpy.props.BoolProperty \
+      (
+      name = "50%",
+      default = False,
+      description = "Build proxies at 50% of the clip resolution"
+      )
+      
+    proxy_workers: bpy.props.IntProperty \
+      (
+      name = "Proxy Processes",
+      default = 2,
+      min = 1,
+      description = "Maximum number of proxies built at the same time"
+      )
+      
     force_render: bpy.props.BoolProperty \
       (
       name = "Force Render",
@@ -254,6 +1172,167 @@ class KeyingGlobalProps(bpy.types.PropertyGroup):
       description = "Automatically backup the .blend file into output folder when rendering"
       )
       
+    backup_count: bpy.props.IntProperty \
+      (
+      name = "Keep Backups",
+      default = 5,
+      min = 0,
+      description = "Number of the newest backups kept in the output folder, older ones are deleted (0 keeps all)"
+      )
+      
+    backup_compress: bpy.props.BoolProperty \
+      (
+      name = "Compress Backups",
+      default = True,
+      description = "Compress the backups of the .blend file"
+      )
+      
+    single_pass_mask: bpy.props.BoolProperty \
+      (
+      name = "Single Pass Mask",
+      default = False,
+      description = "Render the mask together with the video in one pass (adds a File Output branch to the compositor)"
+      )
+      
+    scene_copy_mode: bpy.props.EnumProperty \
+      (
+      name = "New Scenes",
+      description = "How the scenes of newly visited clips are created",
+      items = [
+        ("FULL_COPY", "Full Copy", "Duplicate the whole scene including its objects and world"),
+        ("LINK_COPY", "Linked Copy", "Copy only the scene settings and compositor, share the objects and world")
+        ],
+      default = "FULL_COPY"
+      )
+      
+    queue_order: bpy.props.EnumProperty \
+      (
+      name = "Queue Order",
+      description = "Order in which Render All renders the scenes",
+      items = queue_orders,
+      default = "NAME"
+      )
+      
+    mask_stats: bpy.props.BoolProperty \
+      (
+      name = "Mask Statistics",
+      default = False,
+      description = "After rendering the mask, write the per frame bounding boxes, coverage and a suggested tight crop into mask_stats.json"
+      )
+      
+    mask_threshold: bpy.props.FloatProperty \
+      (
+      name = "Mask Threshold",
+      default = 0.01,
+      min = 0.0,
+      max = 1.0,
+      description = "Mask values above this threshold are included in the bounding boxes"
+      )
+      
+    mask_crop_padding: bpy.props.IntProperty \
+      (
+      name = "Crop Padding",
+      default = 16,
+      min = 0,
+      description = "Padding in pixels added around the bounding box of the suggested crop"
+      )
+      
+    verify_output: bpy.props.BoolProperty \
+      (
+      name = "Verify Output",
+      default = False,
+      description = "After Render All, check the rendered frames of all clips and render the broken frames again"
+      )
+      
+    verify_decode: bpy.props.BoolProperty \
+      (
+      name = "Decode Check",
+      default = False,
+      description = "Also decode the image data of PNG frames while verifying (slower)"
+      )
+      
+    output_profiles: bpy.props.CollectionProperty \
+      (
+      type = KeyingOutputProfile
+      )
+      
+    keyframe_rule: bpy.props.EnumProperty \
+      (
+      name = "Keyframes",
+      description = "How the keyframes are picked from the video frames while they are rendered",
+      items = [
+        ("NONE", "None", "Do not pick keyframes"),
+        ("INTERVAL", "Interval", "Pick every n-th frame"),
+        ("DIFFERENCE", "Difference", "Pick the frames which differ from the last keyframe (and at least every n-th frame)")
+        ],
+      default = "NONE"
+      )
+      
+    keyframe_interval: bpy.props.IntProperty \
+      (
+      name = "Keyframe Interval",
+      default = 25,
+      min = 0,
+      description = "Number of frames between the keyframes (the maximum number for the Difference rule, 0 for no maximum)"
+      )
+      
+    keyframe_threshold: bpy.props.FloatProperty \
+      (
+      name = "Keyframe Difference",
+      default = 0.1,
+      min = 0.0,
+      max = 1.0,
+      description = "Mean difference of the downscaled frame brightness from the last keyframe, above which a frame becomes a keyframe"
+      )
+      
+    max_loaded_clips: bpy.props.IntProperty \
+      (
+      name = "Loaded Clips",
+      description = "Maximum number of movie clips kept loaded, the least recently used clips without tracking data are unloaded and loaded again when needed",
+      default = 16,
+      min = 1
+      )
+      
+    prefetch_size: bpy.props.IntProperty \
+      (
+      name = "Prefetch (MB)",
+      description = "Amount of the next clip in the queue read ahead into the file cache while the current clip renders (0 disables prefetching)",
+      default = 256,
+      min = 0
+      )
+      
+    preview_step: bpy.props.IntProperty \
+      (
+      name = "Preview Step",
+      description = "Render Preview renders every n-th frame of the clip",
+      default = 10,
+      min = 1
+      )
+      
+    preview_frames: bpy.props.StringProperty \
+      (
+      name = "Preview Frames",
+      description = "Frames rendered by Render Preview, e.g. 1, 50, 100-120 (overrides the preview step)"
+      )
+      
+    preview_resolution: bpy.props.IntProperty \
+      (
+      name = "Preview Resolution",
+      description = "Resolution of the preview renders",
+      subtype = "PERCENTAGE",
+      default = 25,
+      min = 1,
+      max = 100
+      )
+      
+    chunk_size: bpy.props.IntProperty \
+      (
+      name = "Chunk Size",
+      description = "Maximum number of frames rendered by one worker of the headless render farm, long clips are split between several workers (0 renders each clip by a single worker)",
+      default = 0,
+      min = 0
+      )
+      
 class KeyingSceneProps(bpy.types.PropertyGroup):
     """Used for storing all of the scene specific user defined settings"""
     render_mask: bpy.props.BoolProperty \
@@ -275,6 +1354,32 @@ class KeyingSceneProps(bpy.types.PropertyGroup):
       description = "Check if you want to render a mask for the current scene"
       )
       
+    clip_path: bpy.props.StringProperty \
+      (
+      name = "Clip Path",
+      description = "Path of the movie clip of the scene, used to load the clip again after it was unloaded",
+      subtype = "FILE_PATH"
+      )
+      
+    clip_settings: bpy.props.StringProperty \
+      (
+      name = "Clip Settings",
+      description = "Colorspace and camera settings of the unloaded movie clip and the nodes which used it, applied when it is loaded again"
+      )
+      
+    clip_name: bpy.props.StringProperty \
+      (
+      name = "Clip Name",
+      description = "Path of the movie clip of the scene relative to the input folder, names the clip, its output folder and the scene"
+      )
+      
+    render_priority: bpy.props.IntProperty \
+      (
+      name = "Priority",
+      description = "Scenes with a higher priority are rendered first, regardless of the queue order",
+      default = 0
+      )
+      
       
 #----------------------------------------
 #   STATES
@@ -285,44 +1390,55 @@ class BeginState(State):
     def update(self, context):
         if not self._state_machine.render_queue:
             self._state_machine.owner.remove_timer(context)
+            if get_master_scene().keying_global.verify_output:
+                #The failed frames of a re-render are reported, but not rendered again
+                start_verification(not self._state_machine.retry)
             return {"FINISHED"} 
-        #Setup the next scene
-        switch_scene(context, self._state_machine.render_queue[0])
-        self._state_machine.render_queue.pop(0)
+        #Setup the next scene (skipping scenes deleted while queued)
+        scene_name = self._state_machine.render_queue.pop()
+        if scene_index.get_scene(scene_name) is None:
+            return {"PASS_THROUGH"}
+        switch_scene(context, scene_name)
+        self._state_machine.stats.begin_clip(scene_name)
         self._state_machine.transition_to(PreparedImageState())
         return {"PASS_THROUGH"}
         
 class PreparedImageState(State):
-    """Begins rendering the image."""
+    """Begins rendering the image (only the missing frames, if it was already rendered previously)."""
     def update(self, context):
-        #File was already rendered previously
-        force_render = get_master_scene().keying_global.force_render
-        if os.path.exists(get_render_subfolder(context)) and not force_render:
-            self._state_machine.transition_to(BeginState())
-        else:
-            switch_to_video(context)
-            self._state_machine.rendering = True
-            bpy.ops.keying.render_current()
-            self.state_machine.transition_to(RenderedImageState())
+        switch_to_video(context)
+        self._state_machine.stats.begin_pass("video")
+        self._state_machine.rendering = "CANCELLED" not in bpy.ops.keying.render_current()
+        if self._state_machine.rendering:
+            #Read the next clip while this one renders
+            prefetch_scene_clip(self._state_machine.render_queue.peek())
+        self.state_machine.transition_to(RenderedImageState())
         return {"PASS_THROUGH"}
         
 class RenderedImageState(State):
     """Checks whether the user has defined mask rendering for the current scene.
-    If they did, then the mask view is switched and rendering of the mask begins.
+    If they did (and the mask was not already written during the video render), then
+    the mask view is switched and rendering of the mask begins.
     Otherwise the evaluation returns to the BeginState"""
     def update(self, context):
-        if context.scene.keying.render_mask:
+        self._state_machine.stats.end_pass()
+        if context.scene.keying.render_mask and not is_mask_output_enabled(context.scene):
             switch_to_mask(context)
-            self._state_machine.rendering = True
-            bpy.ops.keying.render_current()
+            self._state_machine.stats.begin_pass("mask")
+            self._state_machine.rendering = "CANCELLED" not in bpy.ops.keying.render_current()
             self._state_machine.transition_to(RenderedMaskState())
         else:
+            #The mask was written with the video (or did not need rendering)
+            update_scene_mask_stats(context.scene)
+            set_mask_output(context.scene, None)
             self._state_machine.transition_to(BeginState())
         return {"PASS_THROUGH"}
         
 class RenderedMaskState(State):
     """Returns the scene to the previous state and returns the evaluation back to BeginState"""
     def update(self, context):
+        self._state_machine.stats.end_pass()
+        update_scene_mask_stats(context.scene)
         switch_to_video(context)
         self._state_machine.transition_to(BeginState())
         return {"PASS_THROUGH"}
@@ -344,9 +1460,13 @@ class RenderAllCompositeOp(RenderAllOp):
 
     def execute(self, context):
         global_props = get_master_scene().keying_global
-        self.state_machine = StateMachine(BeginState(), self, global_props)
+        #The verification would check the frames while they are rendered again
+        stop_verification()
+        self.state_machine = StateMachine(BeginState(), self, global_props,
+            get_queue_key(global_props.queue_order))
+        self.state_machine.retry = retrying_render
         if global_props.auto_backup:
-            backup_blend_file(global_props.output_path)
+            backup_blend_file(get_abs_output_path(context))
         self.setup_timer(context)
         return {"RUNNING_MODAL"}
         
@@ -354,6 +1474,59 @@ class RenderAllCompositeOp(RenderAllOp):
         self.state_machine.transition_to(CancelledState())
         self.state_machine.rendering = False
 
+class QueueSceneOp(bpy.types.Operator):
+    """Adds the scene of the clip selected in the list into the running render queue."""
+    bl_idname = "keying.queue_scene"
+    bl_label = "Add to Queue"
+    bl_description = "Adds the clip selected in the list into the running render queue"
+    
+    urgent: bpy.props.BoolProperty \
+      (
+      name = "Render Next",
+      description = "Render the clip right after the current one"
+      )
+    
+    @classmethod
+    def poll(cls, context):
+        return state_machine.active_state_machine is not None
+    
+    def execute(self, context):
+        scene_name = get_selected_scene_name()
+        if scene_index.get_scene(scene_name) is None:
+            self.report({"ERROR"},"THE SELECTED CLIP WAS NOT VISITED YET")
+            return {"CANCELLED"}
+        state_machine.active_state_machine.render_queue.push(scene_name, self.urgent)
+        self.report({"INFO"},"CLIP QUEUED")
+        return {"FINISHED"}
+    
+class UnqueueSceneOp(bpy.types.Operator):
+    """Removes the scene of the clip selected in the list from the running render queue."""
+    bl_idname = "keying.unqueue_scene"
+    bl_label = "Remove from Queue"
+    bl_description = "Removes the clip selected in the list from the running render queue"
+    
+    @classmethod
+    def poll(cls, context):
+        return state_machine.active_state_machine is not None
+    
+    def execute(self, context):
+        if not state_machine.active_state_machine.render_queue.remove(get_selected_scene_name()):
+            self.report({"ERROR"},"THE SELECTED CLIP IS NOT QUEUED")
+            return {"CANCELLED"}
+        self.report({"INFO"},"CLIP REMOVED FROM QUEUE")
+        return {"FINISHED"}
+
+class BuildProxiesOp(bpy.types.Operator):
+    """Builds the proxies of all clips in the clip list."""
+    bl_idname = "keying.build_proxies"
+    bl_label = "Build Proxies"
+    bl_description = "Builds the missing or outdated proxies of all clips in the list in the background (requires ffmpeg)"
+    
+    def execute(self, context):
+        build_clip_proxies([clip_item.path for clip_item in get_master_scene().clip_list])
+        self.report({"INFO"},"CHECKING PROXIES OF %d CLIPS" % len(clip_proxy.pending))
+        return {"FINISHED"}
+
 class SwitchClipOp(bpy.types.Operator):
     """Switches the scene to the selected clip."""
     bl_idname = "keying.switch_clip"
@@ -408,6 +1581,25 @@ class PrevOperator(bpy.types.Operator):
         switch_clip(context, index)
         return {"FINISHED"}
 
+class RenderPreviewOp(bpy.types.Operator):
+    """Renders a quick preview of the current scene into the preview folder."""
+    bl_idname = "keying.render_preview"
+    bl_label = "Render Preview"
+    bl_description = "Renders every n-th (or the listed) frame of the current clip at a reduced resolution into the preview folder"
+    
+    @classmethod
+    def poll(cls, context):
+        return state_machine.active_state_machine is None
+    
+    def execute(self, context):
+        try:
+            frame_count = render_preview(context.scene)
+        except ValueError:
+            self.report({"ERROR"},"INVALID PREVIEW FRAMES")
+            return {"CANCELLED"}
+        self.report({"INFO"},"RENDERED %d PREVIEW FRAMES" % frame_count)
+        return {"FINISHED"}
+
 class RenderOperator(bpy.types.Operator):
     """Renders the current scene into the defined output folder."""
     bl_idname = "keying.render_current"
@@ -415,25 +1607,116 @@ class RenderOperator(bpy.types.Operator):
     bl_description = "Renders the current clip"
     
     def execute(self, context):
-        save_path = get_output_clip_path(context)
         force_render = get_master_scene().keying_global.force_render
-        
-        render_subfolder = get_render_subfolder(context)
-        create_directory(save_path)
-        
-        if not context.scene.keying.showing_mask:
-            create_directory(os.path.join(save_path,"keyframes"))
-                
-        if os.path.exists(render_subfolder) and not force_render:
-            return {"FINISHED"}
-        else:
-            create_directory(render_subfolder)
-        
-        updated_auto_frames(self,context)
-        context.scene.render.filepath = render_subfolder + os.path.sep
+        missing_frames = prepare_render(context.scene, force_render)
+        if not missing_frames:
+            return {"CANCELLED"}
+        start_keyframe_picker(context.scene, missing_frames, force_render)
         bpy.ops.render.render("INVOKE_DEFAULT", animation=True, write_still=True)
         return {"FINISHED"}
 
+class VerifyOutputOp(bpy.types.Operator):
+    """Verifies the rendered output of all scenes in the namespace in the background."""
+    bl_idname = "keying.verify_output"
+    bl_label = "Verify Output"
+    bl_description = "Check the rendered frames of all clips, write a report for each clip and render the broken frames again"
+    
+    @classmethod
+    def poll(cls, context):
+        #Frames being rendered would be reported as broken and deleted
+        return verification is None and state_machine.active_state_machine is None
+    
+    def execute(self, context):
+        scene_count = start_verification(True)
+        self.report({"INFO"},"VERIFYING %d CLIPS" % scene_count)
+        return {"FINISHED"}
+
+class AddOutputProfileOp(bpy.types.Operator):
+    """Adds an output profile to the current namespace."""
+    bl_idname = "keying.add_output_profile"
+    bl_label = "Add Output Profile"
+    bl_description = "Use an output profile for the renders of the scenes in this namespace"
+    
+    @classmethod
+    def poll(cls, context):
+        namespace = get_master_scene().keying_global.scene_namespace
+        return bool(namespace) and get_output_profile(namespace) is None
+    
+    def execute(self, context):
+        global_props = get_master_scene().keying_global
+        global_props.output_profiles.add().name = global_props.scene_namespace
+        return {"FINISHED"}
+
+class RemoveOutputProfileOp(bpy.types.Operator):
+    """Removes the output profile of the current namespace."""
+    bl_idname = "keying.remove_output_profile"
+    bl_label = "Remove Output Profile"
+    bl_description = "Render the scenes in this namespace with their own output settings"
+    
+    @classmethod
+    def poll(cls, context):
+        return get_output_profile(get_master_scene().keying_global.scene_namespace) is not None
+    
+    def execute(self, context):
+        global_props = get_master_scene().keying_global
+        global_props.output_profiles.remove(global_props.output_profiles.find(global_props.scene_namespace))
+        return {"FINISHED"}
+
+class CreateScenesOp(bpy.types.Operator):
+    """Creates the scenes of all clips in the list, so that Render All renders all of them."""
+    bl_idname = "keying.create_scenes"
+    bl_label = "Create All Scenes"
+    bl_description = "Create the scenes of all clips which were not visited yet, as copies of the current scene"
+    
+    @classmethod
+    def poll(cls, context):
+        return (state_machine.active_state_machine is None and context.scene.node_tree is not None
+            and "Movie Clip" in context.scene.node_tree.nodes)
+    
+    def execute(self, context):
+        created = create_namespace_scenes(context, context.window.scene)
+        self.report({"INFO"},"CREATED %d SCENES" % created)
+        return {"FINISHED"}
+
+class CloneNamespaceOp(bpy.types.Operator):
+    """Copies the scenes of the current namespace into a new namespace with clips from another folder."""
+    bl_idname = "keying.clone_namespace"
+    bl_label = "Clone Namespace"
+    bl_description = "Copy all scenes of this namespace into a new namespace using the clips of the same names from another input folder"
+    
+    namespace: bpy.props.StringProperty \
+      (
+      name = "New Namespace",
+      description = "Namespace of the cloned scenes"
+      )
+      
+    input_path: bpy.props.StringProperty \
+      (
+      name = "Input Folder",
+      description = "Folder with the clips of the cloned scenes",
+      subtype = "DIR_PATH"
+      )
+    
+    @classmethod
+    def poll(cls, context):
+        return state_machine.active_state_machine is None and bool(get_master_scene().keying_global.scene_namespace)
+    
+    def execute(self, context):
+        global_props = get_master_scene().keying_global
+        if not self.namespace or "/" in self.namespace or self.namespace == global_props.scene_namespace:
+            self.report({"ERROR"},"INVALID NAMESPACE")
+            return {"CANCELLED"}
+        input_path = bpy.path.abspath(self.input_path or global_props.input_path)
+        cloned = clone_namespace(context, global_props.scene_namespace, self.namespace, input_path)
+        global_props.scene_namespace = self.namespace
+        if self.input_path:
+            global_props.input_path = self.input_path
+        self.report({"INFO"},"CLONED %d SCENES" % cloned)
+        return {"FINISHED"}
+    
+    def invoke(self, context, event):
+        return context.window_manager.invoke_props_dialog(self)
+
 class DeleteNamespace(bpy.types.Operator):
     bl_idname = "keying.delete_namespace"
     bl_label = "Delete Namespace Scenes"
@@ -446,13 +1729,14 @@ class DeleteNamespace(bpy.types.Operator):
         return True
 
     def execute(self, context):
-        namespace = get_master_scene().keying_global.scene_namespace
-        scenes = state_machine.filter_scenes(namespace)
-        
-        for scene_name in scenes:
-            scene = bpy.data.scenes[scene_name]
-            bpy.data.scenes.remove(scene)
-        get_master_scene().keying_global.scene_namespace = ""
+        global_props = get_master_scene().keying_global
+        namespace = global_props.scene_namespace
+        scene_count, orphan_count = delete_namespace_scenes(context, namespace)
+        profile_index = global_props.output_profiles.find(namespace)
+        if profile_index >= 0:
+            global_props.output_profiles.remove(profile_index)
+        global_props.scene_namespace = ""
+        self.report({"INFO"},"DELETED %d SCENES AND %d UNUSED DATABLOCKS" % (scene_count, orphan_count))
         return {'FINISHED'}
 
     def invoke(self, context, event):
@@ -463,10 +1747,36 @@ class DeleteNamespace(bpy.types.Operator):
 #----------------------------------------   
 
 class KeyingUIList(bpy.types.UIList):
+    sort_by_length: bpy.props.BoolProperty \
+      (
+      name = "Sort by Length",
+      description = "Sort the clips by their frame count"
+      )
+      
     def draw_item(self, context, layout, data, item, icon, active_data, active_propname, index):
         split = layout.split(factor = 0.1)
         split.label(text=str(index+1))
+        split = split.split(factor = 0.8)
         split.label(text=item.clip_name, icon = item.icon)
+        if item.frame_count > 0:
+            split.label(text=str(item.frame_count))
+    
+    def draw_filter(self, context, layout):
+        row = layout.row()
+        row.prop(self, "filter_name", text="")
+        row.prop(self, "sort_by_length")
+    
+    def filter_items(self, context, data, propname):
+        items = getattr(data, propname)
+        helper = bpy.types.UI_UL_list
+        flt_flags = []
+        flt_neworder = []
+        if self.filter_name:
+            flt_flags = helper.filter_items_by_name(self.filter_name, self.bitflag_filter_item, items, "clip_name")
+        if self.sort_by_length:
+            flt_neworder = helper.sort_items_helper([(i, item.frame_count) for i, item in enumerate(items)],
+                key=lambda x: x[1])
+        return flt_flags, flt_neworder
     
     def invoke(self, context, event):
         pass
@@ -484,9 +1794,13 @@ class KeyingClipPanel(bpy.types.Panel):
         
         box = layout.box()
         box.row().prop(get_master_scene().keying_global, "input_path")
+        box.row().prop(get_master_scene().keying_global, "recursive_scan")
         
         data = get_master_scene()
         box.row().template_list("KeyingUIList", "", data, "clip_list", data, "clip_list_index", rows = 2)
+        total_frames = sum(item.frame_count for item in data.clip_list)
+        if total_frames > 0:
+            box.row().label(text = "Total: %d clips, %d frames" % (len(data.clip_list), total_frames))
         
         split = box.split()
         split.column().operator("keying.prev")
@@ -494,10 +1808,23 @@ class KeyingClipPanel(bpy.types.Panel):
         
         box.row().operator("keying.switch_clip")
         
+        box = layout.box()
+        box.row().label(text = "Proxies")
+        split = box.split()
+        split.column().prop(get_master_scene().keying_global, "proxy_25")
+        split.column().prop(get_master_scene().keying_global, "proxy_50")
+        box.row().prop(get_master_scene().keying_global, "proxy_workers")
+        box.row().prop(get_master_scene().keying_global, "auto_proxies")
+        box.row().operator("keying.build_proxies")
+        if clip_proxy.pending:
+            box.row().label(text = "Building proxies: %d clips left" % len(clip_proxy.pending))
+        
         box = layout.box()
         
         box.row().label(text = "Current Namespace")
         box.row().prop(get_master_scene().keying_global, "scene_namespace")
+        box.row().operator("keying.create_scenes")
+        box.row().operator("keying.clone_namespace")
         box.row().operator("keying.delete_namespace")
    
 class KeyingRenderPanel(bpy.types.Panel):
@@ -522,6 +1849,7 @@ class KeyingRenderPanel(bpy.types.Panel):
             split.column().operator("keying.show_mask")
         
         box.row().prop(context.scene.keying, "auto_frames")
+        box.row().prop(context.scene.keying, "render_priority")
         
 
         box = layout.box()
@@ -529,12 +1857,78 @@ class KeyingRenderPanel(bpy.types.Panel):
         split = box.split()
         split.column().prop(get_master_scene().keying_global, "force_render")
         split.column().prop(get_master_scene().keying_global, "auto_backup")
+        if get_master_scene().keying_global.auto_backup:
+            split = box.split()
+            split.column().prop(get_master_scene().keying_global, "backup_count")
+            split.column().prop(get_master_scene().keying_global, "backup_compress")
+        box.row().prop(get_master_scene().keying_global, "single_pass_mask")
+        box.row().prop(get_master_scene().keying_global, "mask_stats")
+        if get_master_scene().keying_global.mask_stats:
+            split = box.split()
+            split.column().prop(get_master_scene().keying_global, "mask_threshold")
+            split.column().prop(get_master_scene().keying_global, "mask_crop_padding")
+        split = box.split()
+        split.column().prop(get_master_scene().keying_global, "verify_output")
+        split.column().prop(get_master_scene().keying_global, "verify_decode")
+        box.row().operator("keying.verify_output")
+        box.row().prop(get_master_scene().keying_global, "keyframe_rule")
+        if get_master_scene().keying_global.keyframe_rule != "NONE":
+            split = box.split()
+            split.column().prop(get_master_scene().keying_global, "keyframe_interval")
+            if get_master_scene().keying_global.keyframe_rule == "DIFFERENCE":
+                split.column().prop(get_master_scene().keying_global, "keyframe_threshold")
+        box.row().prop(get_master_scene().keying_global, "scene_copy_mode")
+        box.row().prop(get_master_scene().keying_global, "queue_order")
+        box.row().prop(get_master_scene().keying_global, "chunk_size")
+        box.row().prop(get_master_scene().keying_global, "max_loaded_clips")
+        box.row().prop(get_master_scene().keying_global, "prefetch_size")
+        
+        box = layout.box()
+        box.row().label(text = "Output Profile")
+        profile = get_output_profile(get_master_scene().keying_global.scene_namespace)
+        if profile is None:
+            box.row().operator("keying.add_output_profile")
+        else:
+            box.row().prop(profile, "video_format")
+            split = box.split()
+            if profile.video_format == "FFMPEG":
+                split.column().prop(profile, "movie_codec")
+                if profile.movie_codec == "H264":
+                    split.column().prop(profile, "movie_quality")
+            elif profile.video_format == "PNG":
+                split.column().prop(profile, "video_depth")
+            box.row().prop(profile, "mask_format")
+            if profile.mask_format == "PNG":
+                box.row().prop(profile, "mask_depth")
+            if "PNG" in (profile.video_format, profile.mask_format):
+                box.row().prop(profile, "png_compression")
+            if "OPEN_EXR" in (profile.video_format, profile.mask_format):
+                split = box.split()
+                split.column().prop(profile, "exr_codec")
+                split.column().prop(profile, "exr_half")
+            box.row().operator("keying.remove_output_profile")
+        
+        box = layout.box()
+        box.row().label(text = "Preview")
+        split = box.split()
+        split.column().prop(get_master_scene().keying_global, "preview_step")
+        split.column().prop(get_master_scene().keying_global, "preview_resolution")
+        box.row().prop(get_master_scene().keying_global, "preview_frames")
+        box.row().operator("keying.render_preview")
         
         box = layout.box()
         box.row().prop(get_master_scene().keying_global, "output_path")
         split = box.split()
         split.column().operator("keying.render_current")
         split.column().operator("keying.keying_render_all")
+        
+        if state_machine.active_state_machine is not None:
+            box = layout.box()
+            box.row().label(text = "Render Queue: %d clips left" % len(state_machine.active_state_machine.render_queue))
+            split = box.split()
+            split.column().operator("keying.queue_scene")
+            split.column().operator("keying.queue_scene", text = "Render Next").urgent = True
+            box.row().operator("keying.unqueue_scene")
 
 
 
@@ -547,6 +1941,7 @@ classes = (
     KeyingRenderPanel,
     RenderOperator,
     KeyingSceneProps,
+    KeyingOutputProfile,
     KeyingGlobalProps,
     KeyingUIList,
     NextOperator,
@@ -557,6 +1952,15 @@ classes = (
     ShowMaskOp,
     ShowVideoOp,
     DeleteNamespace,
+    QueueSceneOp,
+    UnqueueSceneOp,
+    RenderPreviewOp,
+    BuildProxiesOp,
+    AddOutputProfileOp,
+    RemoveOutputProfileOp,
+    VerifyOutputOp,
+    CreateScenesOp,
+    CloneNamespaceOp,
 )
 
 def register():
@@ -566,8 +1970,36 @@ def register():
     bpy.types.Scene.clip_list = bpy.props.CollectionProperty(type=KeyingClipCollection)
     bpy.types.Scene.clip_list_index = bpy.props.IntProperty()
     bpy.types.Scene.keying_global = bpy.props.PointerProperty(type=KeyingGlobalProps)
+    bpy.app.handlers.load_post.append(clip_residency.clear)
+    scene_index.register()
+    bpy.app.handlers.render_write.append(keyframes.on_render_write)
+    bpy.app.handlers.render_cancel.append(keyframes.on_render_cancel)
+    bpy.app.handlers.render_complete.append(record_movie_render)
 
 def unregister():
+    if bpy.app.timers.is_registered(apply_probe_results):
+        bpy.app.timers.unregister(apply_probe_results)
+    clip_probe.shutdown()
+    clip_prefetch.shutdown()
+    blend_backup.shutdown()
+    if bpy.app.timers.is_registered(apply_verify_results):
+        bpy.app.timers.unregister(apply_verify_results)
+    if verification is not None:
+        verification.shutdown()
+    if bpy.app.timers.is_registered(apply_proxy_results):
+        bpy.app.timers.unregister(apply_proxy_results)
+    clip_proxy.shutdown()
+    keyframes.finish()
+    matte_stats.stop()
+    if keyframes.on_render_write in bpy.app.handlers.render_write:
+        bpy.app.handlers.render_write.remove(keyframes.on_render_write)
+    if keyframes.on_render_cancel in bpy.app.handlers.render_cancel:
+        bpy.app.handlers.render_cancel.remove(keyframes.on_render_cancel)
+    if record_movie_render in bpy.app.handlers.render_complete:
+        bpy.app.handlers.render_complete.remove(record_movie_render)
+    scene_index.unregister()
+    if clip_residency.clear in bpy.app.handlers.load_post:
+        bpy.app.handlers.load_post.remove(clip_residency.clear)
     for cls in reversed(classes):
         bpy.utils.unregister_class(cls)
     del bpy.types.Scene.keying
@@ -0,0 +1,190 @@
+import bpy
+import os
+import json
+import time
+import numpy as np
+from collections import deque
+
+
+STATS_NAME = "mask_stats.json"
+
+#Number of image rows reduced at once, bounds the size of the temporary arrays
+ROWS_PER_CHUNK = 128
+
+#Interval (in seconds) of the timer updating the statistics in the background
+UPDATE_INTERVAL = 0.1
+#Time (in seconds) spent reading the mask frames on one timer tick (at least one frame is read)
+TIME_SLICE = 0.05
+
+#Mask statistics being updated in the background
+updates = deque()
+
+
+def get_frame_stats(matte, threshold):
+    """Returns (bounding box, coverage) of the matte (a height x width array of values 0-1).
+    The bounding box [min x, min y, max x, max y] (inclusive, origin in the bottom left corner
+    like in Blender) contains the pixels above the threshold, it is None for an empty matte.
+    The coverage is the mean matte value."""
+    height, width = matte.shape
+    total = 0.0
+    columns = np.zeros(width, dtype=bool)
+    rows = np.zeros(height, dtype=bool)
+    for start in range(0, height, ROWS_PER_CHUNK):
+        chunk = matte[start:start + ROWS_PER_CHUNK]
+        total += float(chunk.sum(dtype=np.float64))
+        covered = chunk > threshold
+        columns |= covered.any(axis=0)
+        rows[start:start + ROWS_PER_CHUNK] = covered.any(axis=1)
+    coverage = total / (width * height) if width and height else 0.0
+    if not rows.any():
+        return None, coverage
+    x = np.flatnonzero(columns)
+    y = np.flatnonzero(rows)
+    return [int(x[0]), int(y[0]), int(x[-1]), int(y[-1])], coverage
+
+def read_pixels(path, buffer):
+    """Decodes the frame using Blender into the buffer (reused between the frames,
+    reallocated if the frame size changes). Returns (height x width x RGBA view of the buffer, buffer)."""
+    image = bpy.data.images.load(path, check_existing=False)
+    try:
+        width, height = image.size
+        if buffer is None or buffer.size != width * height * 4:
+            buffer = np.empty(width * height * 4, dtype=np.float32)
+        if hasattr(image.pixels, "foreach_get"):
+            image.pixels.foreach_get(buffer)
+        else:
+            buffer[:] = image.pixels[:]
+    finally:
+        bpy.data.images.remove(image)
+    return buffer.reshape(height, width, 4), buffer
+
+def read_matte(path, buffer):
+    """Decodes the mask frame like read_pixels, returns (matte view of the buffer, buffer)."""
+    pixels, buffer = read_pixels(path, buffer)
+    #Mask frames are black and white, the red channel holds the matte
+    return pixels[:, :, 0], buffer
+
+def get_union_bbox(boxes):
+    boxes = np.array([box for box in boxes if box is not None])
+    if len(boxes) == 0:
+        return None
+    return [int(boxes[:, 0].min()), int(boxes[:, 1].min()), int(boxes[:, 2].max()), int(boxes[:, 3].max())]
+
+def get_crop_offset(crop_node):
+    """Returns the (x, y) corner of the crop of the given Crop node in pixels, or None if the node
+    does not crop the image size in pixels (or is None)."""
+    if crop_node is None or crop_node.relative or not crop_node.use_crop_size:
+        return None
+    return min(crop_node.min_x, crop_node.max_x), min(crop_node.min_y, crop_node.max_y)
+
+def get_crop_suggestion(crop_offset, bbox, size, padding):
+    """Returns the tight crop rectangle around the bounding box (with padding) in the rendered frame
+    pixels and, if the (x, y) crop_offset of the Crop node is given, the matching Crop node settings.
+    The crop node has to feed the rendered frame directly (the offset is None if it does not)."""
+    if bbox is None:
+        return None, None
+    width, height = size
+    crop = {"min_x": max(0, bbox[0] - padding), "min_y": max(0, bbox[1] - padding),
+        "max_x": min(width - 1, bbox[2] + padding), "max_y": min(height - 1, bbox[3] + padding)}
+    if crop_offset is None:
+        return crop, None
+    #The rendered frame starts at the corner of the current crop
+    offset_x, offset_y = crop_offset
+    return crop, {"min_x": offset_x + crop["min_x"], "max_x": offset_x + crop["max_x"],
+        "min_y": offset_y + crop["min_y"], "max_y": offset_y + crop["max_y"]}
+
+def load_stats(folder):
+    try:
+        with open(os.path.join(folder, STATS_NAME)) as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {"frames": {}}
+
+class MaskStatsUpdate:
+    """Reads the mask frames ({frame: path}) one by one and writes the per frame bounding
+    boxes and coverage, their union and a suggested crop into a sidecar file in output_path.
+    Frames unchanged since the last update (same size and modification time) are not read again.
+    The frames are read in steps, so the update can be spread over timer ticks."""
+
+    def __init__(self, frame_paths, output_path, threshold=0.01, padding=16, crop_offset=None):
+        self.output_path = output_path
+        self.threshold = threshold
+        self.padding = padding
+        self.crop_offset = crop_offset
+        self.pending = deque(frame_paths.items())
+        stats = load_stats(output_path)
+        if stats.get("threshold") != threshold:
+            stats = {"frames": {}}
+        self.known_frames = stats["frames"]
+        self.size = stats.get("size", [0, 0])
+        self.frames = {}
+        self.buffer = None
+
+    def step(self, deadline=None):
+        """Reads the frames until the deadline (time.perf_counter value) passes, or all of them
+        if there is none. Writes the statistics and returns them once all frames are read, None before."""
+        while self.pending:
+            frame, path = self.pending.popleft()
+            self.read_frame(frame, path)
+            if deadline is not None and time.perf_counter() > deadline:
+                return None
+        return self.write()
+
+    def read_frame(self, frame, path):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return
+        record = [stat.st_size, stat.st_mtime_ns]
+        known = self.known_frames.get(str(frame))
+        if known is not None and known["record"] == record:
+            self.frames[str(frame)] = known
+            return
+        matte, self.buffer = read_matte(path, self.buffer)
+        self.size = [matte.shape[1], matte.shape[0]]
+        bbox, coverage = get_frame_stats(matte, self.threshold)
+        self.frames[str(frame)] = {"record": record, "bbox": bbox, "coverage": round(coverage, 6)}
+
+    def write(self):
+        bbox = get_union_bbox(frame["bbox"] for frame in self.frames.values())
+        crop, crop_settings = get_crop_suggestion(self.crop_offset, bbox, self.size, self.padding)
+        stats = {"threshold": self.threshold, "size": self.size, "frame_count": len(self.frames), "bbox": bbox,
+            "crop": crop, "crop_node": crop_settings, "frames": self.frames}
+        path = os.path.join(self.output_path, STATS_NAME)
+        with open(path + ".tmp", "w") as file:
+            json.dump(stats, file)
+        os.replace(path + ".tmp", path)
+        return stats
+
+def update_mask_stats(frame_paths, output_path, threshold=0.01, padding=16, crop_offset=None):
+    """Updates the mask statistics at once (see MaskStatsUpdate), returns the written statistics."""
+    return MaskStatsUpdate(frame_paths, output_path, threshold, padding, crop_offset).step()
+
+
+#----------------------------------------
+#   BACKGROUND UPDATES
+#----------------------------------------
+def start(frame_paths, output_path, threshold=0.01, padding=16, crop_offset=None):
+    """Starts updating the mask statistics a slice of frames on every timer tick, so the decoding
+    of the frames (on the main thread, by Blender) does not block the user interface or the render queue.
+    An update of the same folder which did not finish yet is replaced."""
+    for queued in list(updates):
+        if queued.output_path == output_path:
+            updates.remove(queued)
+    updates.append(MaskStatsUpdate(frame_paths, output_path, threshold, padding, crop_offset))
+    if not bpy.app.timers.is_registered(update):
+        bpy.app.timers.register(update, first_interval=UPDATE_INTERVAL)
+
+def update():
+    """Timer reading the frames of the queued updates for at most TIME_SLICE seconds."""
+    deadline = time.perf_counter() + TIME_SLICE
+    while updates and time.perf_counter() < deadline:
+        if updates[0].step(deadline) is not None:
+            updates.popleft()
+    return UPDATE_INTERVAL if updates else None
+
+def stop():
+    """Drops the unfinished updates."""
+    updates.clear()
+    if bpy.app.timers.is_registered(update):
+        bpy.app.timers.unregister(update)
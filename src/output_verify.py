@@ -0,0 +1,164 @@
+import os
+import json
+import zlib
+import struct
+import datetime
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from . import render_manifest
+
+
+REPORT_NAME = "verify_report.json"
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+
+def check_png(path):
+    """Reads all chunks of the PNG file, checks their checksums and decompresses the image data
+    (without keeping it). Returns the reason the file is broken, or None if it is valid."""
+    decompressor = zlib.decompressobj()
+    with open(path, "rb") as file:
+        if file.read(len(PNG_SIGNATURE)) != PNG_SIGNATURE:
+            return "invalid header"
+        while True:
+            header = file.read(8)
+            if len(header) < 8:
+                return "truncated"
+            length, chunk_type = struct.unpack(">I4s", header)
+            data = file.read(length)
+            crc = file.read(4)
+            if len(data) < length or len(crc) < 4:
+                return "truncated"
+            if zlib.crc32(chunk_type + data) != struct.unpack(">I", crc)[0]:
+                return "corrupted"
+            if chunk_type == b"IDAT":
+                try:
+                    decompressor.decompress(data)
+                except zlib.error:
+                    return "corrupted image data"
+            elif chunk_type == b"IEND":
+                return None if decompressor.eof else "incomplete image data"
+
+def check_frame(path, decode=False):
+    """Returns the reason the rendered frame is broken (missing, empty, invalid header or trailer,
+    or if decode is set, corrupted PNG data), or None if it is valid."""
+    try:
+        if os.path.getsize(path) == 0:
+            return "empty"
+    except OSError:
+        return "missing"
+    if not render_manifest.check_frame_file(path):
+        return "invalid header"
+    if decode and path.lower().endswith(".png"):
+        try:
+            return check_png(path)
+        except OSError:
+            return "unreadable"
+    return None
+
+def verify_frames(frame_paths, decode=False, remove_failed=False, stopped=None):
+    """Checks the rendered frames ({frame: path}), optionally deleting the broken ones so they get
+    rendered again. Stops early once the stopped event is set.
+    Returns the pass report (number of frames, their total size and the failed frames)."""
+    failed = {}
+    size = 0
+    for frame, path in frame_paths.items():
+        if stopped is not None and stopped.is_set():
+            break
+        reason = check_frame(path, decode)
+        if reason is None:
+            size += os.path.getsize(path)
+            continue
+        failed[str(frame)] = reason
+        if remove_failed and reason != "missing":
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+    return {"frames": len(frame_paths), "bytes": size, "failed": failed}
+
+def verify_movie(folder):
+    """Checks the movie rendered into the folder against the record of its finished render."""
+    record = render_manifest.load_manifest(folder).get("movie")
+    if record is None:
+        return {"frames": 1, "bytes": 0, "failed": {"movie": "unfinished"}}
+    try:
+        size = os.path.getsize(os.path.join(folder, record[0]))
+    except OSError:
+        return {"frames": 1, "bytes": 0, "failed": {record[0]: "missing"}}
+    if size == 0 or size != record[1]:
+        return {"frames": 1, "bytes": size, "failed": {record[0]: "changed since the render"}}
+    return {"frames": 1, "bytes": size, "failed": {}}
+
+def write_report(folder, report):
+    path = os.path.join(folder, REPORT_NAME)
+    with open(path + ".tmp", "w") as file:
+        json.dump(report, file, indent=1)
+    os.replace(path + ".tmp", path)
+
+
+class Verification:
+    """Verifies the output of a batch of scenes in a thread pool (the checks mostly wait for the disk
+    and release the GIL while reading, checksumming and decompressing). The report of a scene
+    is written into its output folder once all of its passes are checked."""
+
+    def __init__(self, decode=False, remove_failed=False, max_workers=8):
+        self.decode = decode
+        self.remove_failed = remove_failed
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        #Stops the passes being verified, so no more frames get deleted after the shutdown
+        self.stopped = threading.Event()
+        self.pending = {}
+        self.reports = {}
+        self.results = {}
+
+    def add(self, scene_name, output_path, pass_name, frame_paths=None, movie_folder=None):
+        """Adds a pass of the scene to verify, either its frames ({frame: path}) or its movie."""
+        if scene_name not in self.reports:
+            self.reports[scene_name] = {"output_path": output_path, "passes": {}}
+        if movie_folder is not None:
+            future = self.executor.submit(verify_movie, movie_folder)
+        else:
+            future = self.executor.submit(verify_frames, frame_paths, self.decode, self.remove_failed, self.stopped)
+        self.pending[(scene_name, pass_name)] = future
+
+    def collect_results(self):
+        """Returns {scene name: passed} of the scenes verified since the last call and writes their reports."""
+        finished = set()
+        for (scene_name, pass_name), future in list(self.pending.items()):
+            if future.done():
+                del self.pending[(scene_name, pass_name)]
+                self.reports[scene_name]["passes"][pass_name] = future.result()
+                finished.add(scene_name)
+        pending_scenes = {scene_name for scene_name, pass_name in self.pending}
+        results = {}
+        for scene_name in finished - pending_scenes:
+            report = self.reports.pop(scene_name)
+            output_path = report.pop("output_path")
+            report["passed"] = not any(result["failed"] for result in report["passes"].values())
+            report["decoded"] = self.decode
+            report["time"] = datetime.datetime.now().isoformat(timespec="seconds")
+            if os.path.isdir(output_path):
+                write_report(output_path, report)
+            results[scene_name] = report["passed"]
+        self.results.update(results)
+        return results
+
+    def get_failed_scenes(self):
+        """Returns the names of the verified scenes which failed the verification."""
+        return sorted(scene_name for scene_name, passed in self.results.items() if not passed)
+
+    def wait(self):
+        """Waits for all of the passes to be verified, returns the names of the failed scenes."""
+        for future in list(self.pending.values()):
+            future.exception()
+        self.collect_results()
+        return self.get_failed_scenes()
+
+    def shutdown(self):
+        self.stopped.set()
+        self.executor.shutdown(wait=False)
+        for future in self.pending.values():
+            future.cancel()
+        self.pending.clear()
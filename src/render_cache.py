@@ -0,0 +1,125 @@
+import bpy
+import os
+import hashlib
+from array import array
+
+
+#Node properties which only affect the node editor, not the rendered image
+ui_properties = frozenset({"rna_type", "name", "label", "location", "width", "width_hidden",
+        "height", "dimensions", "select", "hide", "show_options", "show_preview",
+        "show_texture", "use_custom_color", "color", "parent"})
+
+#Stabilization properties which only affect the clip editor, not the stabilized image
+stabilization_ui_properties = ui_properties | {"active_track_index", "active_rotation_track_index",
+        "show_tracks_expanded"}
+
+#Nodes added by the add-on itself for the single pass mask rendering, the copies of the nodes
+#between Crop and Composite are named by the prefix and the name of the copied node
+MASK_NODE_PREFIX = "Mask "
+MASK_OUTPUT_NAME = "Mask Output"
+
+
+def get_internal_nodes(node_tree):
+    """Returns the names of the nodes of the single pass mask branch in the node tree."""
+    names = {node.name for node in node_tree.nodes}
+    return {name for name in names if name == MASK_OUTPUT_NAME
+        or (name.startswith(MASK_NODE_PREFIX) and name[len(MASK_NODE_PREFIX):] in names)}
+
+
+def get_output_nodes(node_tree):
+    """Returns the names of the Composite and Mask Output nodes and of all nodes their image comes from.
+    Other nodes (viewers, preview branches) do not affect the rendered frames."""
+    input_links = {}
+    for link in node_tree.links:
+        input_links.setdefault(link.to_node.name, []).append(link)
+    pending = [node.name for node in node_tree.nodes
+        if node.bl_idname == "CompositorNodeComposite" or node.name == MASK_OUTPUT_NAME]
+    output_nodes = set(pending)
+    while pending:
+        for link in input_links.get(pending.pop(), ()):
+            if link.from_node.name not in output_nodes:
+                output_nodes.add(link.from_node.name)
+                pending.append(link.from_node.name)
+    return output_nodes
+
+def get_rna_values(struct, skip=ui_properties):
+    """Returns the (name, value) pairs of all plain (non pointer) properties of the given struct."""
+    values = []
+    for prop in struct.bl_rna.properties:
+        if prop.identifier in skip or prop.type in {"POINTER", "COLLECTION"}:
+            continue
+        value = getattr(struct, prop.identifier)
+        if getattr(prop, "is_array", False):
+            value = tuple(value)
+        values.append((prop.identifier, value))
+    return values
+
+def hash_clip(digest, clip):
+    """Adds the source file, frame offsets and stabilization settings of the clip into the digest."""
+    path = bpy.path.abspath(clip.filepath)
+    try:
+        stat = os.stat(path)
+        digest.update(repr((path, stat.st_size, stat.st_mtime_ns)).encode())
+    except OSError:
+        digest.update(path.encode())
+    digest.update(repr((clip.frame_start, clip.frame_offset)).encode())
+
+    stabilization = clip.tracking.stabilization
+    digest.update(repr(get_rna_values(stabilization, stabilization_ui_properties)).encode())
+    if not stabilization.use_2d_stabilization:
+        return
+    for track in clip.tracking.tracks:
+        if not (track.use_2d_stabilization or track.use_2d_stabilization_rotation):
+            continue
+        markers = track.markers
+        coords = array("f", [0.0]) * (len(markers) * 2)
+        frames = array("i", [0]) * len(markers)
+        markers.foreach_get("co", coords)
+        markers.foreach_get("frame", frames)
+        digest.update(track.name.encode())
+        digest.update(coords.tobytes())
+        digest.update(frames.tobytes())
+
+def get_render_key(scene, show_mask, output_settings=None):
+    """Returns a hash of everything that affects the rendered frames of the given scene view:
+    the source clip, the parameters and links of the compositor nodes the output is rendered from
+    and the render settings.
+    The link switched between the video and mask view is replaced by the show_mask flag.
+    If given, the output_settings (values of an output profile) replace the output format of the scene."""
+    digest = hashlib.sha1()
+    digest.update(repr(show_mask).encode())
+
+    node_tree = scene.node_tree
+    internal_nodes = get_internal_nodes(node_tree)
+    output_nodes = get_output_nodes(node_tree) - internal_nodes
+    for node in sorted(node_tree.nodes, key=lambda n: n.name):
+        if node.name not in output_nodes:
+            continue
+        digest.update(repr((node.name, node.bl_idname, get_rna_values(node))).encode())
+        for socket in node.inputs:
+            if not socket.is_linked and hasattr(socket, "default_value"):
+                value = socket.default_value
+                if not isinstance(value, (int, float)):
+                    value = tuple(value)
+                digest.update(repr((socket.identifier, value)).encode())
+        clip = getattr(node, "clip", None)
+        if clip is not None:
+            hash_clip(digest, clip)
+
+    links = []
+    for link in node_tree.links:
+        if link.from_node.name in internal_nodes or link.to_node.name not in output_nodes:
+            continue
+        if link.from_node.name == "Keying" and link.to_node.name == "Crop":
+            continue
+        links.append((link.from_node.name, link.from_socket.identifier,
+            link.to_node.name, link.to_socket.identifier))
+    digest.update(repr(sorted(links)).encode())
+
+    render = scene.render
+    digest.update(repr((render.resolution_x, render.resolution_y, render.resolution_percentage,
+        scene.frame_step)).encode())
+    if output_settings is None:
+        output_settings = get_rna_values(render.image_settings, {"rna_type", "color_mode"})
+    digest.update(repr(output_settings).encode())
+    return digest.hexdigest()
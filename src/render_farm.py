@@ -0,0 +1,220 @@
+import bpy
+import os, sys
+import argparse
+import subprocess
+import time
+from collections import deque
+
+from . import keying_module
+from . import state_machine
+from . import render_manifest
+from . import scene_index
+from .render_queue import RenderQueue
+
+
+#----------------------------------------
+#   WORKER
+#----------------------------------------
+def prepare_passes(scene, force_render, frame_range=None):
+    """Prepares the video (and optionally the mask) pass of the given scene one after another
+    and yields the frames each of them has to render. The scene is returned to the video view after."""
+    passes = [False, True] if scene.keying.render_mask else [False]
+    for show_mask in passes:
+        #The mask was already written during the video render
+        if show_mask and keying_module.is_mask_output_enabled(scene):
+            continue
+        keying_module.set_scene_view(scene, show_mask)
+        yield keying_module.prepare_render(scene, force_render, frame_range)
+    keying_module.set_scene_view(scene, False)
+    keying_module.set_mask_output(scene, None)
+
+def render_scene(scene, force_render, frame_range=None):
+    """Renders the video (and optionally the mask) of the given scene in the current process,
+    either all of its frames or only the given (first, last) chunk of them.
+    Produces the same folder structure as the Render Current operator.
+    Returns whether all of the renders finished."""
+    for missing_frames in prepare_passes(scene, force_render, frame_range):
+        if missing_frames and bpy.ops.render.render(animation=True, scene=scene.name) != {"FINISHED"}:
+            keying_module.set_scene_view(scene, False)
+            keying_module.set_mask_output(scene, None)
+            return False
+    return True
+
+def run_worker(scene_name, force_render, frame_range=None):
+    """Renders a single scene (or a chunk of its frames), returns the process exit code."""
+    scene = scene_index.get_scene(scene_name)
+    if scene is None:
+        print("KEYING FARM: scene %s not found" % scene_name)
+        return 1
+    if not render_scene(scene, force_render, frame_range):
+        print("KEYING FARM: rendering scene %s failed" % scene_name)
+        return 1
+    return 0
+
+
+#----------------------------------------
+#   COORDINATOR
+#----------------------------------------
+def get_worker_command(scene_name, threads, force_render, frame_range=None):
+    """Returns the command line starting a background Blender worker rendering the given scene
+    (or the given (first, last) chunk of its frames)."""
+    expr = "import %s.render_farm as farm; farm.main()" % __package__
+    #Without --python-exit-code an exception in the worker would still exit with code 0
+    command = [bpy.app.binary_path, "-b", bpy.data.filepath, "-t", str(threads),
+        "--python-exit-code", "1", "--python-expr", expr, "--", "--worker", "--scene", scene_name]
+    if frame_range is not None:
+        command += ["--frames", str(frame_range[0]), str(frame_range[1])]
+    if force_render:
+        command.append("--force")
+    return command
+
+def get_render_tasks(render_queue, force_render, chunk_size):
+    """Returns the (scene name, frame range) tasks of the scenes in the queue. The frames that
+    are missing in any pass of a scene are split into chunks of at most chunk_size frames,
+    scenes with nothing to render are left out. Stale and damaged frames get deleted
+    here, before the workers render the chunks in parallel."""
+    tasks = deque()
+    while render_queue:
+        scene_name = render_queue.pop()
+        scene = scene_index.get_scene(scene_name)
+        missing_frames = set()
+        for pass_frames in prepare_passes(scene, force_render):
+            missing_frames.update(pass_frames)
+        #A movie cannot be split between the workers
+        scene_chunk_size = 0 if scene.render.is_movie_format else chunk_size
+        for frame_range in render_manifest.split_into_chunks(sorted(missing_frames), scene_chunk_size):
+            tasks.append((scene_name, frame_range))
+    return tasks
+
+def run_tasks(tasks, workers, threads, force_render, log_path):
+    """Renders the (scene name, frame range) tasks by at most workers parallel background Blender
+    processes and waits for all of them to finish. Returns the names of the failed tasks."""
+    running = []
+    failed = []
+    done = 0
+    total = len(tasks)
+    while tasks or running:
+        while tasks and len(running) < workers:
+            scene_name, frame_range = tasks.popleft()
+            task_name = "%s [%d-%d]" % (scene_name, frame_range[0], frame_range[1])
+            log_name = "%s_%d-%d.log" % (scene_name.replace("/", "_"), frame_range[0], frame_range[1])
+            log_file = open(os.path.join(log_path, log_name), "w")
+            process = subprocess.Popen(get_worker_command(scene_name, threads, force_render, frame_range),
+                stdout=log_file, stderr=subprocess.STDOUT)
+            running.append((process, task_name, log_file, time.time()))
+            #Read the clip of the next chunk while the workers render
+            keying_module.prefetch_scene_clip(tasks[0][0] if tasks else None)
+
+        for worker in list(running):
+            process, task_name, log_file, start_time = worker
+            exit_code = process.poll()
+            if exit_code is None:
+                continue
+            running.remove(worker)
+            log_file.close()
+            done += 1
+            if exit_code != 0:
+                failed.append(task_name)
+            print("KEYING FARM: [%d/%d] %s finished in %.1f s (exit code %d)"
+                % (done, total, task_name, time.time() - start_time, exit_code))
+        time.sleep(0.2)
+    return failed
+
+def run_coordinator(namespace, workers, threads, force_render, queue_order="NAME", chunk_size=0,
+        verify=False, decode=False):
+    """Splits the scenes of the namespace (in the given queue order) between parallel background
+    Blender processes, long scenes are split into chunks of chunk_size frames rendered by
+    separate workers. Waits for all of them to finish, returns the process exit code.
+    If verify is set, the rendered output is verified and the broken frames are rendered once again."""
+    queue_key = keying_module.get_queue_key(queue_order)
+    render_queue = RenderQueue(state_machine.filter_scenes(namespace), queue_key)
+    scene_count = len(render_queue)
+    tasks = get_render_tasks(render_queue, force_render, chunk_size)
+    log_path = os.path.join(keying_module.get_abs_output_path(None), "farm_logs")
+    os.makedirs(log_path, exist_ok=True)
+
+    print("KEYING FARM: rendering %d chunks of %d scenes with %d workers" % (len(tasks), scene_count, workers))
+    failed = run_tasks(tasks, workers, threads, force_render, log_path)
+    if failed:
+        print("KEYING FARM: %d chunks failed: %s" % (len(failed), ", ".join(failed)))
+        return 1
+    if verify:
+        failed_scenes = keying_module.verify_scenes(state_machine.filter_scenes(namespace), decode)
+        if failed_scenes:
+            print("KEYING FARM: rendering the broken frames of %d scenes again" % len(failed_scenes))
+            tasks = get_render_tasks(RenderQueue(failed_scenes, queue_key), False, chunk_size)
+            failed = run_tasks(tasks, workers, threads, False, log_path)
+            if failed:
+                print("KEYING FARM: %d chunks failed: %s" % (len(failed), ", ".join(failed)))
+                return 1
+            failed_scenes = keying_module.verify_scenes(failed_scenes, decode)
+        if failed_scenes:
+            print("KEYING FARM: %d scenes failed the verification: %s" % (len(failed_scenes), ", ".join(failed_scenes)))
+            return 1
+    #The mask statistics of the chunked scenes are collected once all of their chunks are rendered
+    for scene_name in state_machine.filter_scenes(namespace):
+        keying_module.update_scene_mask_stats(scene_index.get_scene(scene_name), False)
+    print("KEYING FARM: RENDER QUEUE FINISHED")
+    return 0
+
+
+#----------------------------------------
+#   ENTRY POINT
+#----------------------------------------
+def int_at_least(minimum):
+    """Returns an argparse type parsing integers not lower than the given minimum."""
+    def parse(value):
+        number = int(value)
+        if number < minimum:
+            raise argparse.ArgumentTypeError("%s is lower than %d" % (value, minimum))
+        return number
+    parse.__name__ = "int"
+    return parse
+
+def parse_args(argv):
+    """Parses the arguments passed to Blender after the -- separator."""
+    if "--" in argv:
+        argv = argv[argv.index("--") + 1:]
+    else:
+        argv = []
+    parser = argparse.ArgumentParser(prog="render_farm",
+        description="Renders all scenes of a namespace using parallel background Blender processes.")
+    parser.add_argument("--namespace", help="Namespace to render (defaults to the one saved in the file)")
+    parser.add_argument("--workers", type=int_at_least(1), default=max(1, os.cpu_count() // 4),
+        help="Number of parallel Blender processes")
+    parser.add_argument("--threads", type=int_at_least(0), default=0,
+        help="Render threads per worker (defaults to cores divided by workers)")
+    parser.add_argument("--force", action="store_true", help="Overwrite already existing renders")
+    parser.add_argument("--order", choices=[order[0] for order in keying_module.queue_orders],
+        help="Order of the scenes (defaults to the queue order saved in the file)")
+    parser.add_argument("--chunk-size", type=int_at_least(0),
+        help="Maximum number of frames per worker (defaults to the chunk size saved in the file, 0 disables chunks)")
+    parser.add_argument("--verify", action="store_true",
+        help="Verify the rendered output and render the broken frames again (defaults to the setting saved in the file)")
+    parser.add_argument("--decode-check", action="store_true", help="Also decode the PNG frames while verifying")
+    parser.add_argument("--frames", type=int, nargs=2, help=argparse.SUPPRESS)
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--scene", help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+def main():
+    """Headless entry point, run as:
+    blender -b file.blend --python-expr "import <addon>.render_farm as farm; farm.main()" -- --workers 8"""
+    args = parse_args(sys.argv)
+    if not hasattr(bpy.types.Scene, "keying_global"):
+        import addon_utils
+        addon_utils.enable(__package__)
+    global_props = keying_module.get_master_scene().keying_global
+    force_render = args.force or global_props.force_render
+
+    if args.worker:
+        sys.exit(run_worker(args.scene, force_render, args.frames))
+
+    namespace = args.namespace or global_props.scene_namespace
+    threads = args.threads or max(1, os.cpu_count() // args.workers)
+    queue_order = args.order or global_props.queue_order
+    chunk_size = args.chunk_size if args.chunk_size is not None else global_props.chunk_size
+    verify = args.verify or global_props.verify_output
+    decode = args.decode_check or global_props.verify_decode
+    sys.exit(run_coordinator(namespace, args.workers, threads, force_render, queue_order, chunk_size,
+        verify, decode))
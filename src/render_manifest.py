@@ -0,0 +1,141 @@
+import os
+import json
+import tempfile
+
+
+MANIFEST_NAME = "render_manifest.json"
+
+#Known headers and trailers of the rendered image formats
+signatures = {
+    ".png": ((b"\x89PNG\r\n\x1a\n",), b"IEND\xaeB`\x82"),
+    ".jpg": ((b"\xff\xd8\xff",), b"\xff\xd9"),
+    ".exr": ((b"\x76\x2f\x31\x01",), None),
+    ".tif": ((b"II*\x00", b"MM\x00*"), None),
+    ".bmp": ((b"BM",), None),
+}
+
+
+def check_frame_file(path):
+    """Returns whether the frame file exists, is not empty and has a valid header (and trailer)."""
+    try:
+        size = os.path.getsize(path)
+        if size == 0:
+            return False
+        signature = signatures.get(os.path.splitext(path)[1].lower())
+        if signature is None:
+            return True
+        headers, trailer = signature
+        with open(path, "rb") as file:
+            header = file.read(max(len(h) for h in headers))
+            if not any(header.startswith(h) for h in headers):
+                return False
+            if trailer is not None:
+                if size < len(header) + len(trailer):
+                    return False
+                file.seek(-len(trailer), os.SEEK_END)
+                return file.read(len(trailer)) == trailer
+    except OSError:
+        return False
+    return True
+
+def get_frame_paths(scene, folder):
+    """Returns the paths of all frames of the scene's frame range in the given folder.
+    The file names follow the scene's render output pattern."""
+    frames = range(scene.frame_start, scene.frame_end + 1, scene.frame_step)
+    return {frame: os.path.join(folder, os.path.basename(scene.render.frame_path(frame=frame)))
+        for frame in frames}
+
+def split_into_chunks(frames, chunk_size):
+    """Splits the sorted frame numbers into (first, last) frame ranges, each containing at most
+    chunk_size of the frames (all of them, if chunk_size is 0). The ranges do not overlap,
+    the frames between them which are not listed are skipped by the render as already rendered."""
+    if chunk_size <= 0:
+        chunk_size = max(1, len(frames))
+    return [(frames[i], frames[min(i + chunk_size, len(frames)) - 1])
+        for i in range(0, len(frames), chunk_size)]
+
+def load_manifest(folder):
+    try:
+        with open(os.path.join(folder, MANIFEST_NAME)) as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {"frames": {}}
+
+def save_manifest(folder, manifest):
+    """Writes the manifest through a temporary file of its own, so processes saving the manifest
+    of the same folder at once never replace each other's temporary file."""
+    handle, temp_path = tempfile.mkstemp(prefix=MANIFEST_NAME, suffix=".tmp", dir=folder)
+    with os.fdopen(handle, "w") as file:
+        json.dump(manifest, file)
+    os.replace(temp_path, os.path.join(folder, MANIFEST_NAME))
+
+def validate_frames(scene, folder, key=None, save=True):
+    """Checks the frames already rendered into the folder and records the valid ones in its manifest.
+    Frames whose size and modification time match the manifest are not read again.
+    Invalid frames are deleted, so they get rendered again. If the given render key differs from
+    the one stored in the manifest, all of the frames are stale and get deleted as well
+    (folders rendered before the key was stored adopt it). The records of frames outside of the
+    scene's frame range are kept, so a chunk of the range can be validated on its own.
+    Without save, the manifest is left unchanged (the frames are still checked and deleted).
+    Returns the list of missing frames."""
+    manifest = load_manifest(folder)
+    stale = key is not None and manifest.get("key", key) != key
+    known_frames = manifest["frames"]
+    frame_paths = get_frame_paths(scene, folder)
+    valid_frames = {} if stale else {frame: record for frame, record in known_frames.items()
+        if int(frame) not in frame_paths}
+    missing_frames = []
+
+    for frame, path in frame_paths.items():
+        try:
+            stat = os.stat(path)
+        except OSError:
+            missing_frames.append(frame)
+            continue
+        record = [stat.st_size, stat.st_mtime_ns]
+        if not stale and (known_frames.get(str(frame)) == record or check_frame_file(path)):
+            valid_frames[str(frame)] = record
+        else:
+            os.remove(path)
+            missing_frames.append(frame)
+
+    manifest["frames"] = valid_frames
+    if key is not None:
+        manifest["key"] = key
+    if save:
+        save_manifest(folder, manifest)
+    return missing_frames
+
+def get_movie_path(scene, folder):
+    """Returns the path of the movie file the scene renders into the given folder (movie output formats)."""
+    return os.path.join(folder, os.path.basename(scene.render.frame_path(frame=scene.frame_start)))
+
+def validate_movie(scene, folder, key, force_render=False):
+    """Checks the movie already rendered into the folder. A movie can only be rendered whole, so it is
+    valid only if its render finished (was recorded by record_movie) with the same render key.
+    Otherwise the movie is deleted.
+    Returns the list of missing frames (all of the frames of the scene's range, or none)."""
+    manifest = load_manifest(folder)
+    path = get_movie_path(scene, folder)
+    try:
+        stat = os.stat(path)
+        record = [os.path.basename(path), stat.st_size, stat.st_mtime_ns]
+    except OSError:
+        record = None
+    if not force_render and manifest.get("key") == key and record is not None and manifest.get("movie") == record:
+        return []
+    if record is not None:
+        os.remove(path)
+    save_manifest(folder, {"frames": {}, "key": key, "movie": None})
+    return list(range(scene.frame_start, scene.frame_end + 1, scene.frame_step))
+
+def record_movie(scene, folder):
+    """Records the movie rendered into the folder as finished, so it is not rendered again."""
+    path = get_movie_path(scene, folder)
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return
+    manifest = load_manifest(folder)
+    manifest["movie"] = [os.path.basename(path), stat.st_size, stat.st_mtime_ns]
+    save_manifest(folder, manifest)
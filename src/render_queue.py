@@ -0,0 +1,62 @@
+import heapq
+import itertools
+
+
+class RenderQueue:
+    """Queue of scene names ordered by a sort key (a function of the scene name).
+    Scenes can be added and removed while the queue is being rendered, urgent scenes
+    go before all of the others. Removed scenes are only marked and dropped once they
+    reach the front, so both adding and removing do not need to rebuild the queue."""
+
+    def __init__(self, scene_names=(), key=None):
+        self.key = key if key is not None else lambda scene_name: scene_name
+        self.counter = itertools.count()
+        self.entries = {}
+        for scene_name in scene_names:
+            self.entries[scene_name] = self.new_entry(scene_name, False)
+        self.heap = list(self.entries.values())
+        heapq.heapify(self.heap)
+
+    def new_entry(self, scene_name, urgent):
+        #The counter keeps equal keys in the order they were added and the names from being compared
+        return [not urgent, self.key(scene_name), next(self.counter), scene_name]
+
+    def push(self, scene_name, urgent=False):
+        """Adds the scene into the queue (moving it, if it is already queued)."""
+        self.remove(scene_name)
+        entry = self.new_entry(scene_name, urgent)
+        self.entries[scene_name] = entry
+        heapq.heappush(self.heap, entry)
+
+    def remove(self, scene_name):
+        """Removes the scene from the queue, returns whether it was queued."""
+        entry = self.entries.pop(scene_name, None)
+        if entry is None:
+            return False
+        entry[-1] = None
+        return True
+
+    def pop(self):
+        """Removes and returns the first scene name of the queue."""
+        while self.heap:
+            scene_name = heapq.heappop(self.heap)[-1]
+            if scene_name is not None:
+                del self.entries[scene_name]
+                return scene_name
+        raise IndexError("pop from an empty render queue")
+
+    def peek(self):
+        """Returns the first scene name of the queue without removing it (None if the queue is empty)."""
+        while self.heap and self.heap[0][-1] is None:
+            heapq.heappop(self.heap)
+        return self.heap[0][-1] if self.heap else None
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, scene_name):
+        return scene_name in self.entries
+
+    def __iter__(self):
+        """Iterates the queued scene names in the render order."""
+        return (entry[-1] for entry in sorted(self.entries.values()))
@@ -0,0 +1,113 @@
+import os, sys
+import json
+import time
+import datetime
+
+
+def get_peak_memory():
+    """Returns the peak memory used by the process in MB, or None if it is not known."""
+    if sys.platform == "win32":
+        import ctypes
+        from ctypes import wintypes
+
+        class ProcessMemoryCounters(ctypes.Structure):
+            _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD),
+                ("PeakWorkingSetSize", ctypes.c_size_t), ("WorkingSetSize", ctypes.c_size_t),
+                ("QuotaPeakPagedPoolUsage", ctypes.c_size_t), ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t), ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                ("PagefileUsage", ctypes.c_size_t), ("PeakPagefileUsage", ctypes.c_size_t)]
+
+        counters = ProcessMemoryCounters()
+        counters.cb = ctypes.sizeof(counters)
+        process = ctypes.windll.kernel32.GetCurrentProcess()
+        if not ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters), counters.cb):
+            return None
+        return counters.PeakWorkingSetSize / 2**20
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    #ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+
+class RenderStats:
+    """Collects the timings of the render queue (state transitions, clips and their video/mask passes)
+    and writes them as JSON lines into a render log in the output folder."""
+
+    def __init__(self, output_path):
+        self.path = os.path.join(output_path,
+            datetime.datetime.now().strftime("render_log_%Y-%m-%d_%H-%M-%S.jsonl"))
+        self.start_time = time.time()
+        self.clips = []
+        self.clip = None
+        self.render_pass = None
+        self.frames_written = 0
+
+    def write(self, record):
+        record["time"] = round(time.time() - self.start_time, 3)
+        try:
+            with open(self.path, "a") as file:
+                file.write(json.dumps(record) + "\n")
+        except OSError:
+            pass
+
+    def state_entered(self, state_name):
+        self.write({"event": "state", "state": state_name,
+            "clip": self.clip["clip"] if self.clip else None})
+
+    def frame_written(self):
+        """Called from the render_write handler for every written frame."""
+        self.frames_written += 1
+
+    def begin_clip(self, scene_name):
+        self.end_clip()
+        self.clip = {"event": "clip", "clip": scene_name, "start": time.time(),
+            "rendered_time": 0.0, "skipped_time": 0.0, "frames": 0}
+
+    def end_clip(self):
+        self.end_pass()
+        if self.clip is None:
+            return
+        self.clip["wall_time"] = round(time.time() - self.clip.pop("start"), 3)
+        self.clip["peak_memory_mb"] = get_peak_memory()
+        self.clips.append(self.clip)
+        self.write(self.clip)
+        self.clip = None
+
+    def begin_pass(self, pass_name):
+        self.end_pass()
+        self.frames_written = 0
+        self.render_pass = {"event": "pass", "clip": self.clip["clip"] if self.clip else None,
+            "pass": pass_name, "start": time.time()}
+
+    def end_pass(self):
+        """Ends the current pass, a pass which did not write any frames counts as skipped."""
+        if self.render_pass is None:
+            return
+        wall_time = time.time() - self.render_pass.pop("start")
+        rendered = self.frames_written > 0
+        self.render_pass.update({"wall_time": round(wall_time, 3), "rendered": rendered,
+            "frames": self.frames_written,
+            "fps": round(self.frames_written / wall_time, 3) if wall_time > 0 else None})
+        if self.clip is not None:
+            self.clip["rendered_time" if rendered else "skipped_time"] += wall_time
+            self.clip["frames"] += self.frames_written
+        self.write(self.render_pass)
+        self.render_pass = None
+
+    def finish(self):
+        """Ends the queue, writes its summary into the log and returns it as a short text."""
+        self.end_clip()
+        wall_time = time.time() - self.start_time
+        rendered_time = sum(clip["rendered_time"] for clip in self.clips)
+        skipped_time = sum(clip["skipped_time"] for clip in self.clips)
+        frames = sum(clip["frames"] for clip in self.clips)
+        slowest = sorted(self.clips, key=lambda clip: clip["wall_time"], reverse=True)[:5]
+        self.write({"event": "summary", "wall_time": round(wall_time, 3), "clips": len(self.clips),
+            "frames": frames, "rendered_time": round(rendered_time, 3),
+            "skipped_time": round(skipped_time, 3), "peak_memory_mb": get_peak_memory(),
+            "slowest": [[clip["clip"], clip["wall_time"]] for clip in slowest]})
+        return "%d clips, %d frames in %.1f s (%.1f s rendering, %.1f s skipping)" \
+            % (len(self.clips), frames, wall_time, rendered_time, skipped_time)
@@ -0,0 +1,127 @@
+import bpy
+import os
+import hashlib
+from bpy.app.handlers import persistent
+
+
+MASTER_SCENE_NAME = "MasterScene"
+
+#Maximum length of a datablock (scene or clip) name in bytes, longer names get cut by Blender
+MAX_NAME_LENGTH = 63
+
+index = None
+
+
+class SceneIndex:
+    """Maps the scene names to the scenes and the namespaces to their scenes (by clip name),
+    built by a single pass over the scenes of the blend file."""
+
+    def __init__(self):
+        self.count = len(bpy.data.scenes)
+        self.scenes = {}
+        self.namespaces = {}
+        for scene in bpy.data.scenes:
+            self.scenes[scene.name] = scene
+            namespace, separator, clip_name = scene.name.partition("/")
+            if separator:
+                self.namespaces.setdefault(namespace, {})[clip_name] = scene.name
+
+    def is_valid(self, scene, scene_name):
+        """Returns whether the indexed scene still exists under its name."""
+        try:
+            return scene.name == scene_name
+        except ReferenceError:
+            return False
+
+
+def invalidate():
+    """Drops the index, it is built again when it is used next time."""
+    global index
+    index = None
+
+def get_index():
+    """Returns the scene index, building it if the scenes were changed (added, removed or renamed) since."""
+    global index
+    if index is None or index.count != len(bpy.data.scenes):
+        index = SceneIndex()
+    return index
+
+def get_scene(scene_name):
+    """Returns the scene of the given name, or None if it does not exist."""
+    scene = get_index().scenes.get(scene_name)
+    if scene is not None and not index.is_valid(scene, scene_name):
+        invalidate()
+        scene = get_index().scenes.get(scene_name)
+    return scene
+
+def get_master_scene():
+    return get_scene(MASTER_SCENE_NAME)
+
+def get_namespace_scenes(namespace):
+    """Returns the names of all scenes in the given namespace (starting with the namespace and a slash)."""
+    if "/" in namespace:
+        #Only the first part of a scene name is indexed as its namespace
+        prefix = namespace + "/"
+        return [scene_name for scene_name in get_index().scenes if scene_name.startswith(prefix)]
+    return list(get_index().namespaces.get(namespace, {}).values())
+
+def get_hashed_name(name, key, max_length=MAX_NAME_LENGTH):
+    """Returns the name followed by a hash of the key (before the extension of the name),
+    the name is cut to fit into max_length bytes."""
+    stem, ext = os.path.splitext(name)
+    suffix = "~" + hashlib.sha1(key.encode()).hexdigest()[:8] + ext
+    return stem.encode()[:max(0, max_length - len(suffix.encode()))].decode(errors="ignore") + suffix
+
+def shorten_name(name, max_length=MAX_NAME_LENGTH):
+    """Returns the name if it fits into max_length bytes, otherwise its beginning followed by a hash
+    of the whole name, so different long names stay different."""
+    if len(name.encode()) <= max_length:
+        return name
+    return get_hashed_name(name, name, max_length)
+
+def get_clip_scene_name(namespace, clip_name):
+    """Returns the name of the scene of the given clip (path relative to the input folder) in the namespace.
+    Clip names too long for a scene name are shortened."""
+    return namespace + "/" + shorten_name(clip_name, MAX_NAME_LENGTH - len(namespace.encode()) - 1)
+
+def get_clip_scene(namespace, clip_name):
+    """Returns the scene of the given clip in the namespace, or None if it was not created yet."""
+    return get_scene(get_clip_scene_name(namespace, clip_name))
+
+
+#----------------------------------------
+#   HANDLERS
+#----------------------------------------
+@persistent
+def on_depsgraph_update(scene, depsgraph=None):
+    """Invalidates the index when a scene is renamed (added and removed scenes change the scene count)."""
+    if index is None:
+        return
+    updates = depsgraph.updates if depsgraph is not None else ()
+    for update in updates:
+        if isinstance(update.id, bpy.types.Scene) and update.id.original.name not in index.scenes:
+            invalidate()
+            return
+
+@persistent
+def on_load(dummy=None):
+    """The scenes of the previous file (or state, after undo) are no longer valid."""
+    invalidate()
+
+handlers = (
+    ("depsgraph_update_post", on_depsgraph_update),
+    ("load_post", on_load),
+    ("undo_post", on_load),
+    ("redo_post", on_load),
+)
+
+def register():
+    for handler_name, handler in handlers:
+        getattr(bpy.app.handlers, handler_name).append(handler)
+
+def unregister():
+    for handler_name, handler in handlers:
+        handler_list = getattr(bpy.app.handlers, handler_name)
+        if handler in handler_list:
+            handler_list.remove(handler)
+    invalidate()
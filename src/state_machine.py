@@ -5,12 +5,20 @@ from abc import ABC, abstractmethod
 import time
 import datetime
 
+from . import render_stats
+from . import scene_index
+from .render_queue import RenderQueue
+
+#State machine of the running Render All, so that scenes can be queued while it renders
+active_state_machine = None
+
+#Interval (in seconds) of checking whether the render finished and the next one can start
+WAKE_UP_INTERVAL = 0.05
+
 
 def filter_scenes(scene_prefix):
-    """Returns all scene names starting with the given prefix."""
-    scenes = bpy.data.scenes.keys()
-    filtered = list(filter(lambda x: x.startswith(scene_prefix + "/"),scenes))
-    return filtered
+    """Returns all scene names starting with the given prefix (namespace)."""
+    return scene_index.get_namespace_scenes(scene_prefix)
     
 #----------------------------------------
 #   STATES
@@ -23,21 +31,31 @@ class StateMachine(ABC):
     render_queue = None
     rendering = False
     owner = None
+    stats = None
+    #Whether the Render All re-renders the frames which failed the output verification
+    retry = False
     
     def transition_to(self, state: State):
         self.state = state
         self.state.state_machine = self
+        self.stats.state_entered(type(state).__name__)
     
-    def __init__(self, state: State, owner, global_props) -> None:
+    def __init__(self, state: State, owner, global_props, queue_key=None) -> None:
+        self.stats = render_stats.RenderStats(bpy.path.abspath(global_props.output_path))
         self.transition_to(state)
         self.rendering = False
         self.owner = owner
             
         namespace = global_props.scene_namespace
-        self.render_queue = filter_scenes(namespace)
+        self.render_queue = RenderQueue(filter_scenes(namespace), queue_key)
         
     def update(self, context):
-        return self.state.update(context)
+        """Evaluates the states one after another until a render is started
+        or the evaluation finishes, so states that do not render are chained without waiting."""
+        result = {"PASS_THROUGH"}
+        while not self.rendering and "FINISHED" not in result:
+            result = self.state.update(context)
+        return result
         
 class State(ABC):
     @property
@@ -65,27 +83,34 @@ class RenderAllOp(bpy.types.Operator):
     timer_event = None
 
     def setup_timer(self, context):
+        global active_state_machine
+        active_state_machine = self.state_machine
         bpy.app.handlers.render_complete.append(self.complete_render)
         bpy.app.handlers.render_cancel.append(self.on_render_cancel)
-        #Create timer event that runs every second to check if render renderQueue needs to be updated
-        self.timer_event = context.window_manager.event_timer_add(1.0, window=context.window)
-        #register this as running in background 
+        bpy.app.handlers.render_write.append(self.on_render_write)
+        #register this as running in background, the first state is evaluated on the first timer event
         context.window_manager.modal_handler_add(self)
+        #The render handlers run on the render thread and only set flags, the short timer
+        #checks them while rendering, so the next render starts right after the previous one
+        self.timer_event = context.window_manager.event_timer_add(WAKE_UP_INTERVAL, window=context.window)
     
     def remove_timer(self, context):
+        global active_state_machine
+        active_state_machine = None
         bpy.app.handlers.render_complete.remove(self.complete_render)
         bpy.app.handlers.render_cancel.remove(self.on_render_cancel)
+        bpy.app.handlers.render_write.remove(self.on_render_write)
         context.window_manager.event_timer_remove(self.timer_event)
-        self.report({"INFO"},"RENDER QUEUE FINISHED")
+        summary = self.state_machine.stats.finish()
+        self.report({"INFO"},"RENDER QUEUE FINISHED: " + summary)
         
     def modal(self, context, event):
-        print(event)
         if event.type == "TIMER" and self.state_machine.rendering is False:
             return self.state_machine.update(context)
         return {"PASS_THROUGH"}
     
+    def on_render_write(self, context, dummy):
+        self.state_machine.stats.frame_written()
+    
     def complete_render(self, context, dummy):
         self.state_machine.rendering = False
-        
-
-
@@ -1,35 +1,177 @@
 import bpy
-import os, glob
-from pathlib import Path
-from enum import Enum
-from abc import ABC, abstractmethod
-import csv
+import os, sys
+import argparse
+import hashlib
+import struct
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 
 from . import keying_module
+from . import state_machine
+from . import scene_index
+
+
+#Header of the binary export format (magic, version, track count, frame count, axis count, first frame),
+#followed by little-endian float32 deltas in the track, frame, axis order
+BIN_HEADER = struct.Struct("<4sIIIIi")
+BIN_MAGIC = b"KTRK"
+
+#File extensions of the export formats
+format_exts = {"CSV": ".csv", "NPY": ".npy", "BIN": ".bin"}
+
+#Stores the hash of the last export next to the exported file
+HASH_NAME = ".tracking_export"
+
+
+def get_export_tracks(clip, settings):
+    """Returns the tracks of the clip chosen for the export by the tracking settings."""
+    tracks = clip.tracking.tracks
+    if settings.track_selection == "NAMED":
+        track = tracks.get(settings.tracker_name)
+        return [track] if track is not None else []
+    if settings.track_selection == "SELECTED":
+        return [track for track in tracks if track.select]
+    return list(tracks)
+
+def read_markers(track):
+    """Reads the frames and positions of the enabled markers of the track in one pass."""
+    markers = track.markers
+    count = len(markers)
+    frames = np.empty(count, dtype=np.int32)
+    coords = np.empty(count * 2, dtype=np.float32)
+    mute = np.empty(count, dtype=bool)
+    markers.foreach_get("frame", frames)
+    markers.foreach_get("co", coords)
+    markers.foreach_get("mute", mute)
+    enabled = ~mute
+    return frames[enabled], coords.reshape(count, 2)[enabled]
+
+def get_tracking_data(tracks, multiplier, axes):
+    """Returns (first frame, deltas) of the given tracks, deltas is a (tracks, frames, axes) array
+    of the per frame position changes multiplied by the multiplier. The frames span all of
+    the enabled markers, positions of missing or disabled frames are linearly interpolated
+    (and held before the first and after the last marker of a track)."""
+    markers = [read_markers(track) for track in tracks]
+    used_markers = [(frames, coords) for frames, coords in markers if len(frames) > 0]
+    if not used_markers:
+        return 0, np.zeros((len(tracks), 0, axes))
+    frame_start = min(int(frames.min()) for frames, coords in used_markers)
+    frame_end = max(int(frames.max()) for frames, coords in used_markers)
+    all_frames = np.arange(frame_start, frame_end + 1)
+
+    #Tracks without enabled markers keep zero deltas in their place
+    positions = np.zeros((len(tracks), len(all_frames), axes))
+    for i, (frames, coords) in enumerate(markers):
+        if len(frames) == 0:
+            continue
+        order = np.argsort(frames)
+        for axis in range(axes):
+            positions[i, :, axis] = np.interp(all_frames, frames[order], coords[order, axis])
+    deltas = np.zeros_like(positions)
+    deltas[:, 1:] = np.diff(positions, axis=1) * multiplier
+    return frame_start, deltas
+
+def write_tracking_data(path, names, frame_start, deltas, export_format):
+    """Writes the tracking deltas into path (without the extension) in the given format,
+    returns the path of the written file.
+    A single track with the X axis is written as the original one column CSV without a header."""
+    path += format_exts[export_format]
+    if export_format == "NPY":
+        np.save(path, deltas.astype(np.float32))
+    elif export_format == "BIN":
+        with open(path, "wb") as file:
+            file.write(BIN_HEADER.pack(BIN_MAGIC, 1, deltas.shape[0], deltas.shape[1],
+                deltas.shape[2], frame_start))
+            file.write(deltas.astype("<f4").tobytes())
+    else:
+        track_count, frame_count, axes = deltas.shape
+        table = deltas.transpose(1, 0, 2).reshape(frame_count, track_count * axes)
+        if track_count == 1 and axes == 1:
+            np.savetxt(path, table, fmt="%.10g", delimiter=",")
+        else:
+            frames = np.arange(frame_start, frame_start + frame_count).reshape(-1, 1)
+            header = ["frame"] + ["%s.%s" % (name, axis) for name in names for axis in "xy"[:axes]]
+            np.savetxt(path, np.hstack((frames, table)), fmt=["%d"] + ["%.10g"] * (track_count * axes),
+                delimiter=",", header=",".join(header), comments="")
+    return path
+
+def prepare_export(clip, settings, output_path):
+    """Reads the tracking data of the clip chosen by the settings.
+    Returns an export job (folder, file path, track names, first frame, deltas, format, hash),
+    or None if no track was found."""
+    tracks = get_export_tracks(clip, settings)
+    if not tracks:
+        return None
+    clip_name = os.path.splitext(clip.name)[0]
+    axes = 2 if settings.export_axes == "XY" else 1
+    names = [track.name for track in tracks]
+    frame_start, deltas = get_tracking_data(tracks, settings.tracking_multiplier, axes)
+    digest = hashlib.sha1(deltas.tobytes())
+    digest.update(repr((names, frame_start, deltas.shape, settings.export_format)).encode())
+    folder = os.path.join(output_path, clip_name)
+    return (folder, os.path.join(folder, clip_name), names, frame_start, deltas,
+        settings.export_format, digest.hexdigest())
+
+def is_exported(job):
+    """Returns whether the same tracking data was already exported by the job."""
+    folder, path, names, frame_start, deltas, export_format, digest = job
+    try:
+        with open(os.path.join(folder, HASH_NAME)) as file:
+            exported = file.read().strip() == digest
+    except OSError:
+        return False
+    return exported and os.path.exists(path + format_exts[export_format])
+
+def run_export(job):
+    """Writes the tracking data of the export job together with its hash."""
+    folder, path, names, frame_start, deltas, export_format, digest = job
+    keying_module.create_directory(folder)
+    write_tracking_data(path, names, frame_start, deltas, export_format)
+    with open(os.path.join(folder, HASH_NAME), "w") as file:
+        file.write(digest)
+
+def get_namespace_clips(namespace):
+    """Returns (clip, scene) pairs of the movie clips used by the scenes of the namespace, each clip once."""
+    clips = {}
+    for scene_name in state_machine.filter_scenes(namespace):
+        scene = scene_index.get_scene(scene_name)
+        if scene is None:
+            continue
+        clip_node = scene.node_tree.nodes.get("Movie Clip") if scene.node_tree else None
+        if clip_node is not None and clip_node.clip is not None and clip_node.clip.name not in clips:
+            clips[clip_node.clip.name] = (clip_node.clip, scene)
+    return list(clips.values())
+
+def export_namespace(namespace, output_path, force=False, max_workers=4):
+    """Exports the tracking data of all clips of the namespace, each with the tracking settings
+    of its scene. The data is read on the main thread and written by parallel threads.
+    Clips whose tracking data did not change since the last export are skipped, unless force is set.
+    Returns the (exported, skipped, not found) clip counts."""
+    jobs = []
+    skipped = 0
+    not_found = 0
+    for clip, scene in get_namespace_clips(namespace):
+        job = prepare_export(clip, scene.tracking_local, output_path)
+        if job is None:
+            not_found += 1
+        elif not force and is_exported(job):
+            skipped += 1
+        else:
+            jobs.append(job)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        list(executor.map(run_export, jobs))
+    return len(jobs), skipped, not_found
 
 def export_tracking_data(self, context):
     clip = context.space_data.clip
-    clip_name = os.path.splitext(clip.name)[0]
-    tracker_name = context.scene.tracking_local.tracker_name
-    output_path = os.path.join(keying_module.get_abs_output_path(context),clip_name)
-    keying_module.create_directory(output_path)
-    
-    file = open(os.path.join(output_path,clip_name+".csv"), "w", newline='')
-    writer = csv.writer(file, delimiter=',')
-    
-    multiplier = context.scene.tracking_local.tracking_multiplier
-    tracker = clip.tracking.tracks.get(tracker_name)
-    if tracker is not None:
-        prev = tracker.markers[0].co[0]
-        for m in tracker.markers:
-            writer.writerow([(m.co[0] - prev) * multiplier])
-            prev = m.co[0]
+    settings = context.scene.tracking_local
+    job = prepare_export(clip, settings, keying_module.get_abs_output_path(context))
+    if job is not None:
+        run_export(job)
         self.report({"INFO"},"TRACKER SUCESSFULLY EXPORTED")
     else:
         self.report({"ERROR"},"TRACKER NOT FOUND")
-        
-    file.close()
-            
+
 
 #----------------------------------------
 #   PROPERTIES
@@ -50,6 +192,41 @@ class TrackingSceneProps(bpy.types.PropertyGroup):
       min = 0.0001
       )
       
+    track_selection: bpy.props.EnumProperty \
+      (
+      name = "Tracks",
+      description = "Tracks to export",
+      items = [
+        ("NAMED", "Named", "Export the track with the given name"),
+        ("SELECTED", "Selected", "Export all selected tracks"),
+        ("ALL", "All", "Export all tracks of the clip")
+        ],
+      default = "NAMED"
+      )
+      
+    export_axes: bpy.props.EnumProperty \
+      (
+      name = "Axes",
+      description = "Axes of the exported movement",
+      items = [
+        ("X", "X", "Export the horizontal movement"),
+        ("XY", "X and Y", "Export the horizontal and vertical movement")
+        ],
+      default = "X"
+      )
+      
+    export_format: bpy.props.EnumProperty \
+      (
+      name = "Format",
+      description = "File format of the exported data",
+      items = [
+        ("CSV", "CSV", "Comma separated text file"),
+        ("NPY", "NumPy", "NumPy array file (tracks x frames x axes)"),
+        ("BIN", "Binary", "Little-endian float32 data with a 24 byte header, can be memory-mapped")
+        ],
+      default = "CSV"
+      )
+      
 class TrackingPanel(bpy.types.Panel):
     bl_label = "Tracking Panel"
     bl_idname = "SCENE_PT_tracking_rendering"
@@ -64,9 +241,14 @@ class TrackingPanel(bpy.types.Panel):
         
         box = layout.box()
         box.row().label(text = "Tracking export")
-        box.row().prop(scene.tracking_local, "tracker_name")
+        box.row().prop(scene.tracking_local, "track_selection")
+        if scene.tracking_local.track_selection == "NAMED":
+            box.row().prop(scene.tracking_local, "tracker_name")
+        box.row().prop(scene.tracking_local, "export_axes")
+        box.row().prop(scene.tracking_local, "export_format")
         box.row().prop(scene.tracking_local, "tracking_multiplier")
         box.row().operator("tracking.export_data")
+        box.row().operator("tracking.export_namespace")
 
         
 class TrackingExportDataOp(bpy.types.Operator):
@@ -78,8 +260,20 @@ class TrackingExportDataOp(bpy.types.Operator):
         export_tracking_data(self, context)
         return {"FINISHED"}
       
+class TrackingExportNamespaceOp(bpy.types.Operator):
+    bl_idname = "tracking.export_namespace"
+    bl_label = "Export Namespace"
+    bl_description = "Export the tracking data of all clips in the current namespace"
+    
+    def execute(self, context):
+        namespace = keying_module.get_master_scene().keying_global.scene_namespace
+        exported, skipped, not_found = export_namespace(namespace, keying_module.get_abs_output_path(context))
+        self.report({"INFO"},"EXPORTED %d CLIPS, %d UNCHANGED, %d WITHOUT TRACKER" % (exported, skipped, not_found))
+        return {"FINISHED"}
+      
 classes = (
     TrackingExportDataOp,
+    TrackingExportNamespaceOp,
     TrackingPanel,
     TrackingSceneProps
 )
@@ -92,4 +286,24 @@ def register():
 def unregister():
     for cls in reversed(classes):
         bpy.utils.unregister_class(cls)
-    del bpy.types.Scene.tracking_local
\ No newline at end of file
+    del bpy.types.Scene.tracking_local
+
+def main():
+    """Headless entry point exporting the tracking data of a whole namespace, run as:
+    blender -b file.blend --python-expr "import <addon>.tracking_module as t; t.main()" -- --namespace clips"""
+    argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+    parser = argparse.ArgumentParser(prog="tracking_module",
+        description="Exports the tracking data of all clips in a namespace.")
+    parser.add_argument("--namespace", help="Namespace to export (defaults to the one saved in the file)")
+    parser.add_argument("--output", help="Output folder (defaults to the one saved in the file)")
+    parser.add_argument("--force", action="store_true", help="Export even the unchanged clips")
+    args = parser.parse_args(argv)
+    if not hasattr(bpy.types.Scene, "tracking_local"):
+        import addon_utils
+        addon_utils.enable(__package__)
+
+    global_props = keying_module.get_master_scene().keying_global
+    namespace = args.namespace or global_props.scene_namespace
+    output_path = args.output or keying_module.get_abs_output_path(None)
+    exported, skipped, not_found = export_namespace(namespace, output_path, args.force)
+    print("TRACKING EXPORT: %d exported, %d unchanged, %d without tracker" % (exported, skipped, not_found))